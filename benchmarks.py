@@ -0,0 +1,350 @@
+"""
+Offline benchmark suite for the simulator, decision and vision-parsing hot paths.
+
+    python benchmarks.py                      # run, write bench_results.json, compare to baseline
+    python benchmarks.py --update-baseline    # accept the current numbers as the new baseline
+
+Every result is in operations per second (higher is better). A benchmark regresses when it
+falls more than --threshold below the baseline, and the script then exits with status 1.
+No display, network or API key is needed; benchmarks whose module cannot be imported
+here are reported as skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(HERE, 'bench_results.json')
+BASELINE_FILE = os.path.join(HERE, 'bench_baseline.json')
+THRESHOLD = 0.20          # Allowed slowdown vs baseline before a benchmark counts as a regression
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    """
+    Register a factory under `name`. The factory returns either (callable to time, operations per call)
+    or an already measured throughput as a float.
+    """
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit)
+        return fn
+    return register
+
+
+def measure(fn, ops_per_call, min_time=0.2, repeats=5):
+    """Best-of-`repeats` throughput of `fn`, each repeat running for at least `min_time` seconds."""
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls * ops_per_call / elapsed)
+    return best
+
+
+def _sample_hands(n, seed=0):
+    rng = random.Random(seed)
+    ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+    suits = ['H', 'D', 'C', 'S', '']
+    card = lambda: rng.choice(ranks) + rng.choice(suits)
+    return [([card() for _ in range(rng.choice([2, 2, 2, 3, 4]))], [card()]) for _ in range(n)]
+
+
+# --- Simulator ---
+
+@benchmark('play_round', 'hands/s')
+def bench_play_round(quick):
+    import blackjack
+    shoe = blackjack.Shoe(blackjack.NUM_DECKS, rng=0)
+    ai = blackjack.AI_Player(10 ** 12)
+    n = 200 if quick else 2000
+
+    def run():
+        for _ in range(n):
+            blackjack.play_round(shoe, ai)
+    return run, n
+
+
+@benchmark('play_table_round[7 seats]', 'hands/s')
+def bench_play_table_round(quick):
+    import blackjack
+    shoe = blackjack.Shoe(blackjack.NUM_DECKS, rng=0)
+    players = [blackjack.AI_Player(10 ** 12) for _ in range(7)]
+    n = 30 if quick else 300
+
+    def run():
+        for _ in range(n):
+            blackjack.play_table_round(shoe, players)
+    return run, n * len(players)
+
+
+@benchmark('simulate_batch', 'hands/s')
+def bench_simulate_batch(quick):
+    import blackjack_batch
+    sessions, rounds = (1000, 20) if quick else (10000, 50)
+    return lambda: blackjack_batch.simulate_batch(sessions, rounds, seed=0), sessions * rounds
+
+
+# --- Decisions ---
+
+@benchmark('AI_Player.get_move', 'decisions/s')
+def bench_ai_player_get_move(quick):
+    import blackjack
+    ai = blackjack.AI_Player(0)
+    cases = []
+    for player, dealer in _sample_hands(1000):
+        hand = blackjack.Hand()
+        for c in player:
+            hand.add_card(blackjack.Card(c.rstrip('HDCS') or '2', 'S'))
+        cases.append((hand, blackjack.Card(dealer[0].rstrip('HDCS') or '2', 'S')))
+
+    def run():
+        for hand, up in cases:
+            ai.get_move(hand, up)
+    return run, len(cases)
+
+
+@benchmark('BlackjackAgent.get_move', 'decisions/s')
+def bench_agent_get_move(quick):
+    from blackjack_agent import BlackjackAgent
+    agent = BlackjackAgent()
+    cases = _sample_hands(1000)
+
+    def run():
+        for player, dealer in cases:
+            agent.get_move(player, dealer)
+    return run, len(cases)
+
+
+@benchmark('BlackjackAgent.update_count', 'cards/s')
+def bench_agent_update_count(quick):
+    from blackjack_agent import BlackjackAgent
+    agent = BlackjackAgent()
+    cards = [c for player, dealer in _sample_hands(1000) for c in player + dealer]
+    return lambda: agent.update_count(cards), len(cards)
+
+
+@benchmark('BlackjackAgent.analyze_hand', 'hands/s')
+def bench_agent_analyze_hand(quick):
+    from blackjack_agent import BlackjackAgent
+    agent = BlackjackAgent()
+    hands = [player for player, _ in _sample_hands(1000)]
+
+    def run():
+        for hand in hands:
+            agent.analyze_hand(hand)
+    return run, len(hands)
+
+
+@benchmark('MultiTableAgent.get_moves', 'decisions/s')
+def bench_multi_table_get_moves(quick):
+    from multi_table import MultiTableAgent
+    agent = MultiTableAgent(32)
+    entries = [(player, dealer, i % 32) for i, (player, dealer) in enumerate(_sample_hands(1000))]
+    return lambda: agent.get_moves(entries), len(entries)
+
+
+# --- Live loop helpers ---
+
+@benchmark('get_card_deltas', 'calls/s')
+def bench_get_card_deltas(quick):
+    from main_loop import get_card_deltas
+    frames = _sample_hands(1000)
+    pairs = list(zip(frames, frames[1:]))
+
+    def run():
+        for (cur, _), (prev, _) in pairs:
+            get_card_deltas(cur, prev)
+    return run, len(pairs)
+
+
+def _response_samples():
+    clean = '{"player": {"count": 2, "cards": ["A", "10"]}, "dealer": {"count": 1, "cards": ["K"]}}'
+    fenced = "Here are the cards I can see:\n```json\n" + clean + "\n```\nLet me know if you need anything else."
+    # Long chatty output with stray braces after the object: worst case for prefix-retrying parsers
+    adversarial = "Sure! " + clean + " " + "{ note: this is not json } " * 400
+    # Unquoted keys and braces in the prose before the real object; every candidate but the last fails
+    malformed = "Let me think {player: A 10} {dealer: K}. " * 50 + fenced
+    # Cut off mid-object (output token limit): no complete object anywhere, so the parser must give up
+    truncated = "Looking at the table " * 100 + clean[:-20]
+    return {'clean': clean, 'fenced': fenced, 'adversarial': adversarial,
+            'malformed': malformed, 'truncated': truncated}
+
+
+def _extract_json_benchmark(kind):
+    def bench(quick):
+        from cards_viewing import parse_response
+        text = _response_samples()[kind]
+
+        def run():
+            try:
+                parse_response(text)
+            except ValueError:
+                pass
+        return run, 1
+    return bench
+
+
+for _kind in ('clean', 'fenced', 'adversarial', 'malformed', 'truncated'):
+    benchmark(f'extract_json[{_kind}]', 'parses/s')(_extract_json_benchmark(_kind))
+
+
+def _span_benchmark(on):
+    def bench(quick):
+        import metrics
+
+        def run():
+            metrics.enable(on)
+            try:
+                for _ in range(1000):
+                    with metrics.span('bench'):
+                        pass
+            finally:
+                metrics.enable(False)
+                metrics.reset()
+        return run, 1000
+    return bench
+
+
+benchmark('metrics.span[disabled]', 'spans/s')(_span_benchmark(False))
+benchmark('metrics.span[enabled]', 'spans/s')(_span_benchmark(True))
+
+# --- Frame upload payload ---
+
+BENCH_REGIONS = {'dealer': (1500, 300, 2400, 700), 'player': (1500, 1400, 2400, 1800)}
+
+
+def _synthetic_screen():
+    """A busy 4K frame, so encoders cannot cheat on flat colour."""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (3840, 2160), (0, 90, 30))
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(0)
+    for _ in range(4000):
+        x, y = rng.randint(0, 3830), rng.randint(0, 2150)
+        draw.rectangle([x, y, x + rng.randint(2, 60), y + rng.randint(2, 60)],
+                       fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    return image
+
+
+def _encode_benchmark(roi):
+    def bench(quick):
+        import card_regions
+        image = _synthetic_screen()
+        if roi:
+            return lambda: card_regions.encode_frame(image, BENCH_REGIONS), 1
+        return lambda: card_regions.encode_frame(image, None, max_width=None, quality=75), 1
+    return bench
+
+
+benchmark('encode_frame[full 4K]', 'frames/s')(_encode_benchmark(False))
+benchmark('encode_frame[roi]', 'frames/s')(_encode_benchmark(True))
+
+
+# --- Import time ---
+# Measured in a fresh interpreter each time, so nothing is already cached in sys.modules
+
+IMPORT_MODULES = ['blackjack', 'blackjack_agent', 'cards_viewing', 'screenshot', 'message', 'main_loop']
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def _import_benchmark(module):
+    def bench(quick):
+        seconds = []
+        for _ in range(3 if quick else 7):
+            proc = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+                                  cwd=HERE, capture_output=True, text=True)
+            if proc.returncode:
+                raise ImportError(proc.stderr.strip().splitlines()[-1])
+            seconds.append(float(proc.stdout))
+        return 1 / min(seconds)
+    return bench
+
+
+for _module in IMPORT_MODULES:
+    benchmark(f'import {_module}', 'imports/s')(_import_benchmark(_module))
+
+
+# --- Runner ---
+
+def run_all(names=None, quick=False):
+    results = {}
+    for name, (factory, unit) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        try:
+            made = factory(quick)
+        except ImportError as e:
+            results[name] = {'unit': unit, 'skipped': f'{type(e).__name__}: {e}'}
+            print(f"{name:<32} skipped ({e})")
+            continue
+        if isinstance(made, float):
+            value = made
+        else:
+            value = measure(*made, min_time=0.05 if quick else 0.2, repeats=3 if quick else 5)
+        results[name] = {'unit': unit, 'value': value}
+        print(f"{name:<32} {value:>16,.0f} {unit}")
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Return the names of benchmarks that dropped more than `threshold` below `baseline`."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name, {}).get('value')
+        if base is None or 'value' not in result:
+            continue
+        ratio = result['value'] / base
+        flag = 'REGRESSION' if ratio < 1 - threshold else ''
+        print(f"{name:<32} {ratio:>8.2f}x baseline {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--quick', action='store_true', help='smaller workloads, for smoke runs')
+    args = parser.parse_args(argv)
+
+    results = run_all(args.names, args.quick)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)['results']
+    return 1 if compare(results, baseline, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
-import random
-import matplotlib.pyplot as plt
+import argparse
+from array import array
+import numpy as np
+
+import strategy
+from recorder import BankrollRecorder
 
 # --- Configuration ---
 NUM_DECKS = 2
@@ -8,6 +12,11 @@ MAX_BET = 500         # Standard table maximum
 STARTING_BANKROLL = 10000
 ROUNDS_TO_SIMULATE = 1000
 DECK_PENETRATION = 0.75 # Shuffle after 75% of cards are dealt
+KELLY_FRACTION = 0.75   # Fraction of full Kelly to bet
+BJ_VARIANCE = 1.3       # Variance of one blackjack hand, in units of the bet
+PROGRESS_EVERY = 100000 # Print running statistics every N hands
+PLOT_FILE = None        # e.g. 'bankroll.png' to save the plot instead of opening a window
+SPILL_FILE = None       # e.g. 'bankroll.f64' to keep every bankroll on disk
 
 # --- Constants ---
 SUITS = ['H', 'D', 'C', 'S']
@@ -23,64 +32,115 @@ HI_LO_VALUES = {
 }
 
 class Card:
+    __slots__ = ('rank', 'suit', 'value', 'hard_value', 'is_ace', 'count_value')
+
     def __init__(self, rank, suit):
         self.rank = rank
         self.suit = suit
         self.value = VALUES[rank]
+        self.is_ace = rank == 'A'
+        self.hard_value = 1 if self.is_ace else self.value
         self.count_value = HI_LO_VALUES[rank]
 
+# Every physical card as a shared object; a shoe stores indexes into DECK (rank-major, so code >> 2 is the rank index)
+DECK = [Card(r, s) for r in RANKS for s in SUITS]
+
 class Shoe:
-    def __init__(self, num_decks):
+    def __init__(self, num_decks, rng=None):
         self.num_decks = num_decks
-        self.cards = []
+        self.total_cards = 52 * num_decks
+        self.rng = np.random.default_rng(rng)
+        # Plain arrays for fast scalar access, with NumPy views over the same memory for shuffling and analysis
+        self._cards = array('b', list(range(52)) * num_decks)
+        self._counts = array('i', [0] * len(RANKS))
+        self.cards = np.frombuffer(self._cards, dtype=np.int8)
+        self.rank_counts = np.frombuffer(self._counts, dtype=np.int32)
+        self.position = 0
         self.reshuffle()
 
     def reshuffle(self):
-        self.cards = [Card(r, s) for r in RANKS for s in SUITS] * self.num_decks
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        self.rank_counts[:] = 4 * self.num_decks
         self.running_count = 0
 
+    def cards_remaining(self):
+        return self.total_cards - self.position
+
     def draw(self):
-        if not self.cards:
+        if self.position >= self.total_cards:
             self.reshuffle()
-        card = self.cards.pop()
+        code = self._cards[self.position]
+        self.position += 1
+        self._counts[code >> 2] -= 1
+        card = DECK[code]
         self.running_count += card.count_value
         return card
 
+    def deal(self, n):
+        """Draw `n` cards at once (one slice of the shoe) for dealing a whole table."""
+        start = self.position
+        if start + n > self.total_cards:
+            return [self.draw() for _ in range(n)]
+        self.position = start + n
+        counts = self._counts
+        cards = []
+        for code in self._cards[start:start + n]:
+            counts[code >> 2] -= 1
+            card = DECK[code]
+            self.running_count += card.count_value
+            cards.append(card)
+        return cards
+
     def needs_shuffle(self):
-        total_cards = 52 * self.num_decks
-        return (len(self.cards) / total_cards) < (1 - DECK_PENETRATION)
+        return (self.cards_remaining() / self.total_cards) < (1 - DECK_PENETRATION)
 
     def get_true_count(self):
-        decks_remaining = max(len(self.cards) / 52, 0.5)
+        decks_remaining = max(self.cards_remaining() / 52, 0.5)
         return self.running_count / decks_remaining
 
 class Hand:
+    # Totals are kept up to date by add_card, so every check below is an attribute read
+    __slots__ = ('cards', 'bet', 'surrendered', 'num_cards', 'hard_total', 'aces', 'value', 'soft')
+
     def __init__(self):
         self.cards = []
         self.bet = 0
         self.surrendered = False
+        self.num_cards = 0
+        self.hard_total = 0   # Every Ace counted as 1
+        self.aces = 0
+        self.value = 0
+        self.soft = False     # True while one Ace can count as 11 without busting
 
     def add_card(self, card):
         self.cards.append(card)
+        self.num_cards += 1
+        self.hard_total += card.hard_value
+        if card.is_ace:
+            self.aces += 1
+        self.soft = self.aces > 0 and self.hard_total + 10 <= 21
+        self.value = self.hard_total + 10 if self.soft else self.hard_total
 
     def get_value(self):
-        value = sum(c.value for c in self.cards)
-        aces = sum(1 for c in self.cards if c.rank == 'A')
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
-        return value
+        return self.value
 
     def is_soft(self):
-        low_ace_val = sum(c.value if c.rank != 'A' else 1 for c in self.cards)
-        if low_ace_val > 21: return False
-        return any(c.rank == 'A' for c in self.cards) and (low_ace_val + 10 <= 21)
+        return self.soft
+
+    def is_bust(self):
+        return self.value > 21
+
+    def is_blackjack(self):
+        return self.num_cards == 2 and self.value == 21
 
 class AI_Player:
-    def __init__(self, bankroll):
+    def __init__(self, bankroll, spill_path=None, num_decks=NUM_DECKS):
         self.bankroll = bankroll
-        self.history = [bankroll]
+        # Strategy for this simulator's rules (dealer stands on soft 17, late surrender), cached on disk
+        self.moves = strategy.move_names(strategy.rules_table(num_decks))
+        # Constant-memory history: online stats plus a downsampled trace
+        self.history = BankrollRecorder(bankroll, spill_path=spill_path)
 
     def decide_bet(self, true_count):
         # --- SMARTER BETTING: KELLY CRITERION ---
@@ -98,10 +158,10 @@ class AI_Player:
         if advantage <= 0:
             bet = MIN_BET
         else:
-            kelly_fraction = advantage / 1.3
+            kelly_fraction = advantage / BJ_VARIANCE
             # We use "Fractional Kelly" (e.g., 0.5 Kelly) to reduce volatility.
             # Full Kelly is mathematically optimal for growth but very risky emotionally.
-            safe_kelly = kelly_fraction * 0.75
+            safe_kelly = kelly_fraction * KELLY_FRACTION
             bet = self.bankroll * safe_kelly
 
         # 3. Apply Table Limits & Integer rounding
@@ -111,39 +171,37 @@ class AI_Player:
         return min(bet, self.bankroll)
 
     def get_move(self, player_hand, dealer_up_card):
-        player_val = player_hand.get_value()
-        dealer_val = dealer_up_card.value
-        is_soft = player_hand.is_soft()
-
-        # Surrender
-        if len(player_hand.cards) == 2:
-            if player_val == 16 and dealer_val in [9, 10, 11]: return 'SURRENDER'
-            if player_val == 15 and dealer_val == 10: return 'SURRENDER'
-
-        # Soft Totals
-        if is_soft:
-            if player_val >= 20: return 'STAND'
-            if player_val == 19: return 'DOUBLE' if dealer_val == 6 and len(player_hand.cards)==2 else 'STAND'
-            if player_val == 18:
-                if dealer_val in [2,3,4,5,6]: return 'DOUBLE' if len(player_hand.cards)==2 else 'STAND'
-                if dealer_val in [9,10,11]: return 'HIT'
-                return 'STAND'
-            if player_val == 17: return 'DOUBLE' if dealer_val in [3,4,5,6] and len(player_hand.cards)==2 else 'HIT'
-            if player_val in [15,16]: return 'DOUBLE' if dealer_val in [4,5,6] and len(player_hand.cards)==2 else 'HIT'
-            if player_val in [13,14]: return 'DOUBLE' if dealer_val in [5,6] and len(player_hand.cards)==2 else 'HIT'
-            return 'HIT'
-
-        # Hard Totals
-        else:
-            if player_val >= 17: return 'STAND'
-            if player_val == 16: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
-            if player_val == 15: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
-            if player_val in [13,14]: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
-            if player_val == 12: return 'STAND' if dealer_val in [4,5,6] else 'HIT'
-            if player_val == 11: return 'DOUBLE' if len(player_hand.cards)==2 else 'HIT'
-            if player_val == 10: return 'DOUBLE' if dealer_val < 10 and len(player_hand.cards)==2 else 'HIT'
-            if player_val == 9: return 'DOUBLE' if dealer_val in [3,4,5,6] and len(player_hand.cards)==2 else 'HIT'
-            return 'HIT'
+        two_cards = player_hand.num_cards == 2
+        return strategy.lookup(player_hand.value, player_hand.soft,
+                               dealer_up_card.value, two_cards, two_cards, self.moves)
+
+def play_hand(shoe, ai, player_hand, dealer_up_card):
+    """Play one seat's turn. Returns True if the hand still needs the dealer (stood or doubled);
+    surrendered and bust hands are settled and recorded here."""
+    bet = player_hand.bet
+    while True:
+        move = ai.get_move(player_hand, dealer_up_card)
+        if move == 'SURRENDER':
+            player_hand.surrendered = True
+            ai.bankroll += bet * 0.5
+            ai.history.append(ai.bankroll)
+            return False
+        elif move == 'DOUBLE':
+            if ai.bankroll >= bet:
+                ai.bankroll -= bet
+                player_hand.bet += bet
+                player_hand.add_card(shoe.draw())
+                return True
+            else:
+                move = 'HIT'
+
+        if move == 'HIT':
+            player_hand.add_card(shoe.draw())
+            if player_hand.is_bust():
+                ai.history.append(ai.bankroll)
+                return False
+        elif move == 'STAND':
+            return True
 
 def play_round(shoe, ai):
     if shoe.needs_shuffle(): shoe.reshuffle()
@@ -164,8 +222,8 @@ def play_round(shoe, ai):
     dealer_hand.add_card(dealer_up_card)
 
     # Check Naturals
-    p_bj = (player_hand.get_value() == 21)
-    d_bj = (dealer_hand.get_value() == 21)
+    p_bj = player_hand.is_blackjack()
+    d_bj = dealer_hand.is_blackjack()
 
     if d_bj and p_bj:
         ai.bankroll += bet
@@ -180,36 +238,15 @@ def play_round(shoe, ai):
         return
 
     # Player Turn
-    while True:
-        move = ai.get_move(player_hand, dealer_up_card)
-        if move == 'SURRENDER':
-            player_hand.surrendered = True
-            ai.bankroll += bet * 0.5
-            ai.history.append(ai.bankroll)
-            return
-        elif move == 'DOUBLE':
-            if ai.bankroll >= bet:
-                ai.bankroll -= bet
-                player_hand.bet += bet
-                player_hand.add_card(shoe.draw())
-                break
-            else:
-                move = 'HIT'
-        
-        if move == 'HIT':
-            player_hand.add_card(shoe.draw())
-            if player_hand.get_value() > 21: # Bust
-                ai.history.append(ai.bankroll)
-                return
-        elif move == 'STAND':
-            break
+    if not play_hand(shoe, ai, player_hand, dealer_up_card):
+        return
 
     # Dealer Turn
-    while dealer_hand.get_value() < 17:
+    while dealer_hand.value < 17:
         dealer_hand.add_card(shoe.draw())
 
-    p_val = player_hand.get_value()
-    d_val = dealer_hand.get_value()
+    p_val = player_hand.value
+    d_val = dealer_hand.value
 
     if d_val > 21 or p_val > d_val:
         ai.bankroll += player_hand.bet * 2
@@ -218,25 +255,173 @@ def play_round(shoe, ai):
 
     ai.history.append(ai.bankroll)
 
+def play_table_round(shoe, players):
+    """
+    One round at a multi-seat table: every seat in `players` (AI_Player-like) bets on the same
+    true count and plays from the shared shoe against one dealer hand.
+    Cards are dealt in one slice, in casino order (a card to each seat, then the dealer, twice).
+    Seats that cannot cover MIN_BET sit out. With one seat this plays exactly like play_round.
+    """
+    if shoe.needs_shuffle(): shoe.reshuffle()
+
+    # Bet
+    true_count = shoe.get_true_count()
+    seats = []
+    for ai in players:
+        if ai.bankroll < MIN_BET:
+            continue
+        bet = ai.decide_bet(true_count)
+        ai.bankroll -= bet
+        hand = Hand()
+        hand.bet = bet
+        seats.append((ai, hand))
+    if not seats:
+        return 0
+
+    # Deal
+    n = len(seats)
+    cards = shoe.deal(2 * n + 2)
+    dealer_hand = Hand()
+    for i, (_, hand) in enumerate(seats):
+        hand.add_card(cards[i])
+        hand.add_card(cards[n + 1 + i])
+    dealer_hand.add_card(cards[n])
+    dealer_up_card = cards[-1]
+    dealer_hand.add_card(dealer_up_card)
+
+    # Check Naturals
+    if dealer_hand.is_blackjack():
+        for ai, hand in seats:
+            if hand.is_blackjack():
+                ai.bankroll += hand.bet
+            ai.history.append(ai.bankroll)
+        return n
+
+    # Player Turns
+    standing = []
+    for ai, hand in seats:
+        if hand.is_blackjack():
+            ai.bankroll += hand.bet + (hand.bet * 1.5)
+            ai.history.append(ai.bankroll)
+        elif play_hand(shoe, ai, hand, dealer_up_card):
+            standing.append((ai, hand))
+    if not standing:
+        return n
+
+    # Dealer Turn
+    while dealer_hand.value < 17:
+        dealer_hand.add_card(shoe.draw())
+
+    d_val = dealer_hand.value
+    for ai, hand in standing:
+        p_val = hand.value
+        if d_val > 21 or p_val > d_val:
+            ai.bankroll += hand.bet * 2
+        elif p_val == d_val:
+            ai.bankroll += hand.bet
+        ai.history.append(ai.bankroll)
+    return n
+
+def plot_history(history, output=None):
+    """Plot a BankrollRecorder trace. Saves to `output` when given (no display needed), otherwise shows a window."""
+    import matplotlib
+    if output:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(history.trace_hands, history.trace, linewidth=1, color='#2c3e50')
+    plt.title(f'Blackjack AI Performance (Kelly Criterion)\nStarting: ${history.start} | Final: ${history.last:.2f}')
+    plt.xlabel('Hands Played')
+    plt.ylabel('Bankroll ($)')
+    plt.axhline(y=history.start, color='r', linestyle='--', label='Break Even')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    if output:
+        plt.savefig(output, dpi=120)
+        plt.close()
+    else:
+        plt.show()
+
 # --- RUN SIMULATION ---
-shoe = Shoe(NUM_DECKS)
-ai = AI_Player(STARTING_BANKROLL)
-
-print(f"Simulating {ROUNDS_TO_SIMULATE} hands using Kelly Criterion betting...")
-for _ in range(ROUNDS_TO_SIMULATE):
-    if ai.bankroll < MIN_BET:
-        print("Bankrupt!")
-        break
-    play_round(shoe, ai)
-
-# --- VISUALIZATION ---
-plt.figure(figsize=(12, 6))
-plt.plot(ai.history, linewidth=1, color='#2c3e50')
-plt.title(f'Blackjack AI Performance (Kelly Criterion)\nStarting: ${STARTING_BANKROLL} | Final: ${ai.bankroll:.2f}')
-plt.xlabel('Hands Played')
-plt.ylabel('Bankroll ($)')
-plt.axhline(y=STARTING_BANKROLL, color='r', linestyle='--', label='Break Even')
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+def run_simulation(rounds=ROUNDS_TO_SIMULATE, num_decks=NUM_DECKS, seed=None,
+                   bankroll=STARTING_BANKROLL, spill_path=None, progress_every=PROGRESS_EVERY):
+    """Play up to `rounds` hands one at a time and return the AI_Player (its history holds the stats)."""
+    shoe = Shoe(num_decks, rng=seed)
+    ai = AI_Player(bankroll, spill_path=spill_path, num_decks=num_decks)
+
+    for hand in range(1, rounds + 1):
+        if ai.bankroll < MIN_BET:
+            print("Bankrupt!")
+            break
+        play_round(shoe, ai)
+        if progress_every and hand % progress_every == 0:
+            print(ai.history.summary())
+    ai.history.close()
+    return ai
+
+
+def run_table_simulation(rounds=ROUNDS_TO_SIMULATE, seats=7, num_decks=NUM_DECKS, seed=None,
+                         bankroll=STARTING_BANKROLL, progress_every=PROGRESS_EVERY):
+    """Play `rounds` rounds with `seats` AI_Players sharing one shoe; returns the players.
+    Stops early once every seat is below MIN_BET."""
+    shoe = Shoe(num_decks, rng=seed)
+    players = [AI_Player(bankroll, num_decks=num_decks) for _ in range(seats)]
+
+    for round_number in range(1, rounds + 1):
+        if not play_table_round(shoe, players):
+            print("Every seat is bankrupt!")
+            break
+        if progress_every and round_number % progress_every == 0:
+            print(f"Round {round_number}: " + ", ".join(f"{ai.bankroll:.0f}" for ai in players))
+    for ai in players:
+        ai.history.close()
+    return players
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the Kelly-betting blackjack AI.")
+    parser.add_argument('--rounds', type=int, default=ROUNDS_TO_SIMULATE, help='hands per session')
+    parser.add_argument('--decks', type=int, default=NUM_DECKS)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--bankroll', type=float, default=STARTING_BANKROLL)
+    parser.add_argument('--output', default=PLOT_FILE, help='save the plot here instead of opening a window')
+    parser.add_argument('--spill', default=SPILL_FILE, help='write every bankroll to this raw float64 file')
+    parser.add_argument('--no-plot', action='store_true')
+    parser.add_argument('--sessions', type=int, default=0,
+                        help='simulate this many independent sessions with the batch engine instead')
+    parser.add_argument('--workers', type=int, default=None, help='processes for --sessions (default: all cores)')
+    parser.add_argument('--seats', type=int, default=1,
+                        help='AI players at the table, all drawing from one shoe (--rounds counts dealer rounds)')
+    args = parser.parse_args(argv)
+
+    if args.sessions:
+        from monte_carlo import run_parallel
+        report, _ = run_parallel(args.sessions, args.rounds, workers=args.workers, seed=args.seed or 0,
+                                 num_decks=args.decks, starting_bankroll=args.bankroll)
+        for key, value in report.items():
+            print(f"{key}: {value}")
+        return report
+
+    if args.seats > 1:
+        print(f"Simulating {args.rounds} rounds with {args.seats} seats using Kelly Criterion betting...")
+        players = run_table_simulation(args.rounds, args.seats, args.decks, args.seed, args.bankroll)
+        for seat, ai in enumerate(players, 1):
+            print(f"Seat {seat}: {ai.history.summary()}")
+        if not args.no_plot:
+            plot_history(players[0].history, args.output)
+        return players
+
+    print(f"Simulating {args.rounds} hands using Kelly Criterion betting...")
+    ai = run_simulation(args.rounds, args.decks, args.seed, args.bankroll, args.spill)
+    print(ai.history.summary())
+
+    # --- VISUALIZATION ---
+    if not args.no_plot:
+        plot_history(ai.history, args.output)
+    return ai
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,127 @@
+from contextlib import contextmanager
+
+import strategy
+from ev_engine import EVEngine, value_index
+
+# --- Card Codes ---
+# Card strings are turned into rank codes (index into RANKS) once, when they enter the agent;
+# everything after that works on the small ints. UNKNOWN marks strings that are not a card.
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+UNKNOWN = len(RANKS)
+ACE = RANKS.index('A')
+# Indexed by code; the extra last entry is for UNKNOWN (worth 0, never counted)
+HI_LO_BY_CODE = [1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1, 0]
+VALUE_BY_CODE = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11, 0]
+HARD_BY_CODE = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1, 0]
+
+SUIT_CHARS = 'HDCS\u2660\u2665\u2666\u2663\u2664\u2661\u2662\u2667'
+RANK_ALIASES = {'T': '10', 'ACE': 'A', 'KING': 'K', 'QUEEN': 'Q', 'JACK': 'J', 'TEN': '10'}
+
+_token_codes = {}   # Interning cache: the few dozen distinct tokens the vision step produces
+
+
+def normalize_rank(card_str):
+    """Rank string ('2'-'10', 'J', 'Q', 'K', 'A') for inputs like '10S', 'As', ' kh', 'T♠'; None if not a card."""
+    token = str(card_str).strip().upper().replace(' ', '')
+    rank = token.strip(SUIT_CHARS) or token
+    rank = RANK_ALIASES.get(rank, rank)
+    return rank if rank in RANKS else None
+
+
+def card_code(card_str):
+    """Interned rank code for a card string (UNKNOWN if it is not a card)."""
+    code = _token_codes.get(card_str)
+    if code is None:
+        rank = normalize_rank(card_str)
+        code = _token_codes[card_str] = UNKNOWN if rank is None else RANKS.index(rank)
+    return code
+
+
+class HandTotals:
+    """Running totals for a hand given as card strings, extended one card at a time."""
+    __slots__ = ('cards', 'hard_total', 'aces', 'value', 'soft')
+
+    def __init__(self):
+        self.cards = []
+        self.hard_total = 0   # Every Ace counted as 1
+        self.aces = 0
+        self.value = 0
+        self.soft = False
+
+    def add(self, card, code):
+        self.cards.append(card)
+        if code == ACE:
+            self.aces += 1
+        self.hard_total += HARD_BY_CODE[code]
+        self.soft = self.aces > 0 and self.hard_total + 10 <= 21
+        self.value = self.hard_total + 10 if self.soft else self.hard_total
+
+
 class BlackjackAgent:
-    def __init__(self, num_decks=6):
+    def __init__(self, num_decks=6, use_ev=False, hit_soft_17=False, surrender=True):
         self.num_decks = num_decks
+        # Basic strategy for these rules from the on-disk cache, or the built-in chart if none was generated
+        self.moves = strategy.move_names(strategy.rules_table(num_decks, hit_soft_17, surrender))
         self.running_count = 0
         self.cards_seen = 0
         self.total_cards = num_decks * 52
-        
-        # Values for counting (Hi-Lo System)
-        self.HI_LO = {
-            '2': 1, '3': 1, '4': 1, '5': 1, '6': 1,
-            '7': 0, '8': 0, '9': 0,
-            '10': -1, 'J': -1, 'Q': -1, 'K': -1, 'A': -1
-        }
-        
-        # Values for hand calculation
-        self.VALUES = {
-            '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
-            '10': 10, 'J': 10, 'Q': 10, 'K': 10, 'A': 11
-        }
-
-    def _parse_card(self, card_str):
-        """Extracts rank from card strings like '10H', 'Ah', '10'."""
-        # Remove suit characters (H, D, C, S) if present, case insensitive
-        rank = card_str.upper().strip('HDCS')
-        return rank
+        # Unseen cards per rank code, and every code applied since the last reset (for rollback)
+        self.remaining = [4 * num_decks] * len(RANKS)
+        self._journal = []
+
+        # Totals of the last hand analyzed; a call on the same hand plus new cards only adds the new ones
+        self._hand = HandTotals()
+
+        # Optional composition-dependent decisions, evaluated on `remaining`
+        self.ev_engine = EVEngine(num_decks, hit_soft_17, surrender) if use_ev else None
+
+    def reset(self):
+        """Fresh shoe: clear the count, the composition and the rollback journal."""
+        self.running_count = 0
+        self.cards_seen = 0
+        self.remaining = [4 * self.num_decks] * len(RANKS)
+        self._journal.clear()
 
     def update_count(self, new_cards):
         """Call this whenever NEW cards are revealed on the table."""
         for card in new_cards:
-            rank = self._parse_card(card)
-            if rank in self.HI_LO:
-                self.running_count += self.HI_LO[rank]
+            code = card_code(card)
+            if code != UNKNOWN:
+                self.running_count += HI_LO_BY_CODE[code]
                 self.cards_seen += 1
+                self.remaining[code] -= 1
+                self._journal.append(code)
+
+    def snapshot(self):
+        """O(1) marker of the current count state, for restore()."""
+        return len(self._journal)
+
+    def restore(self, mark):
+        """Undo every card counted since snapshot() returned `mark` (cost is one step per undone card)."""
+        journal = self._journal
+        while len(journal) > mark:
+            code = journal.pop()
+            self.running_count -= HI_LO_BY_CODE[code]
+            self.cards_seen -= 1
+            self.remaining[code] += 1
+
+    @contextmanager
+    def lookahead(self, cards):
+        """Temporarily count `cards` for a what-if evaluation; the state is rolled back on exit."""
+        mark = self.snapshot()
+        try:
+            self.update_count(cards)
+            yield self
+        finally:
+            self.restore(mark)
+
+    def composition(self):
+        """Remaining cards as EVEngine counts (by value, tens merged, never negative)."""
+        counts = [0] * 10
+        for code, n in enumerate(self.remaining):
+            if n > 0:
+                counts[value_index(VALUE_BY_CODE[code])] += n
+        return counts
 
     def get_true_count(self):
         decks_remaining = max((self.total_cards - self.cards_seen) / 52, 0.5)
@@ -38,28 +129,14 @@ class BlackjackAgent:
 
     def analyze_hand(self, cards):
         """Calculates value and checks if hand is soft."""
-        value = 0
-        aces = 0
-        for card in cards:
-            rank = self._parse_card(card)
-            value += self.VALUES.get(rank, 0)
-            if rank == 'A':
-                aces += 1
-        
-        # Adjust Aces
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
-            
-        # Is Soft? (True if we have an Ace counting as 11)
-        # We check this by seeing if the raw total without reducing that specific Ace 
-        # would allow an 11. 
-        # Simplified: If we used an Ace as 11 and didn't bust, it's soft.
-        is_soft = (aces > 0) and (value <= 21) 
-        # Note: The logic above simplifies 'aces' to mean "aces currently counting as 11"
-        # because we decremented 'aces' in the while loop for every Ace forced to be 1.
-        
-        return value, (aces > 0)
+        hand = self._hand
+        seen = len(hand.cards)
+        if len(cards) < seen or cards[:seen] != hand.cards:
+            hand = self._hand = HandTotals()
+            seen = 0
+        for card in cards[seen:]:
+            hand.add(card, card_code(card))
+        return hand.value, hand.soft
 
     def get_move(self, player_cards, dealer_cards):
         """
@@ -72,45 +149,17 @@ class BlackjackAgent:
         # Parse dealer upcard (assume index 0 is visible)
         if not dealer_cards:
             raise ValueError("Dealer must have at least one card")
-        dealer_rank = self._parse_card(dealer_cards[0])
-        dealer_val = self.VALUES[dealer_rank]
-
-        # --- 1. SURRENDER CHECK ---
-        if len(player_cards) == 2:
-            if player_val == 16 and dealer_val in [9, 10, 11]: return 'SURRENDER'
-            if player_val == 15 and dealer_val == 10: return 'SURRENDER'
-
-        # --- 2. SOFT TOTALS ---
-        if is_soft:
-            if player_val >= 20: return 'STAND'
-            if player_val == 19:
-                return 'DOUBLE' if dealer_val == 6 and len(player_cards) == 2 else 'STAND'
-            if player_val == 18:
-                if dealer_val in [2,3,4,5,6]: return 'DOUBLE' if len(player_cards) == 2 else 'STAND'
-                if dealer_val in [9,10,11]: return 'HIT'
-                return 'STAND'
-            if player_val == 17:
-                return 'DOUBLE' if dealer_val in [3,4,5,6] and len(player_cards) == 2 else 'HIT'
-            if player_val in [15, 16]:
-                return 'DOUBLE' if dealer_val in [4,5,6] and len(player_cards) == 2 else 'HIT'
-            if player_val in [13, 14]:
-                return 'DOUBLE' if dealer_val in [5,6] and len(player_cards) == 2 else 'HIT'
-            return 'HIT'
-
-        # --- 3. HARD TOTALS ---
-        else:
-            if player_val >= 17: return 'STAND'
-            if player_val == 16: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
-            if player_val == 15: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
-            if player_val in [13,14]: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
-            if player_val == 12: return 'STAND' if dealer_val in [4,5,6] else 'HIT'
-            
-            # Double logic
-            if player_val == 11: 
-                return 'DOUBLE' if len(player_cards) == 2 else 'HIT'
-            if player_val == 10: 
-                return 'DOUBLE' if dealer_val < 10 and len(player_cards) == 2 else 'HIT'
-            if player_val == 9: 
-                return 'DOUBLE' if dealer_val in [3,4,5,6] and len(player_cards) == 2 else 'HIT'
-            
-            return 'HIT'
+        dealer_code = card_code(dealer_cards[0])
+        if dealer_code == UNKNOWN:
+            raise ValueError(f"Unrecognized dealer card: {dealer_cards[0]!r}")
+        dealer_val = VALUE_BY_CODE[dealer_code]
+
+        # Surrender and double are only offered on the first two cards
+        two_cards = len(player_cards) == 2
+        if self.ev_engine:
+            counts = self.composition()
+            if sum(counts):
+                hand = self._hand
+                return self.ev_engine.best_move(hand.hard_total, hand.aces > 0, dealer_val,
+                                                two_cards, two_cards, counts=counts)
+        return strategy.lookup(player_val, is_soft, dealer_val, two_cards, two_cards, self.moves)
@@ -0,0 +1,249 @@
+import numpy as np
+
+from blackjack import (
+    NUM_DECKS, MIN_BET, MAX_BET, STARTING_BANKROLL, DECK_PENETRATION, KELLY_FRACTION, BJ_VARIANCE,
+    RANKS, VALUES, HI_LO_VALUES
+)
+import strategy
+from strategy import HIT, STAND, DOUBLE, SURRENDER
+
+# --- Rank Codes ---
+# Cards are stored as their index into RANKS (0 = '2' ... 12 = 'A'); suits never matter.
+ACE = RANKS.index('A')
+RANK_VALUES = np.array([VALUES[r] for r in RANKS], dtype=np.int16)        # Ace as 11
+HARD_VALUES = np.where(np.arange(len(RANKS)) == ACE, 1, RANK_VALUES)       # Ace as 1
+COUNT_VALUES = np.array([HI_LO_VALUES[r] for r in RANKS], dtype=np.int16)
+STRATEGY = strategy.as_array()    # Built-in chart; simulate_batch uses the table for its deck count
+
+
+def hand_values(hard, aces):
+    """Vectorized Hand.get_value / Hand.is_soft from hard totals and ace counts."""
+    soft = (aces > 0) & (hard + 10 <= 21)
+    return np.where(soft, hard + 10, hard), soft
+
+
+def decide_bets(bankroll, true_count, min_bet=MIN_BET, max_bet=MAX_BET,
+                kelly=KELLY_FRACTION, variance=BJ_VARIANCE):
+    """Vectorized AI_Player.decide_bet."""
+    advantage = np.where(true_count <= 1, -0.005, 0.005 * (true_count - 1.5))
+    kelly_fraction = advantage / variance
+    safe_kelly = kelly_fraction * kelly
+    bet = np.where(advantage <= 0, min_bet, bankroll * safe_kelly)
+    bet = np.maximum(min_bet, np.minimum(bet, max_bet))
+    return np.minimum(bet, bankroll)
+
+
+def _mix64(x):
+    """SplitMix64 finalizer on a uint64 array (wraps on overflow)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def keyed_permutations(shuffle_seed, shoe_ids, shuffle_numbers, size):
+    """
+    One permutation of range(size) per row, determined only by (shuffle_seed, shoe id, shuffle number).
+    Shoe i gets the same k-th shuffle whatever the rules, bets or timing around it,
+    which gives common random numbers across configurations.
+    """
+    base = _mix64(np.uint64(shuffle_seed) ^ _mix64(shoe_ids.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+                                                    + shuffle_numbers.astype(np.uint64)))
+    keys = _mix64(base[:, None] + np.arange(size, dtype=np.uint64) * np.uint64(0xD1B54A32D192ED03))
+    return np.argsort(keys, axis=1)
+
+
+class BatchShoe:
+    """
+    Many independent shoes held as one (num_shoes, num_decks * 52) array of rank codes.
+    Shuffles come from `rng`, or from keyed_permutations when `shuffle_seed` is set;
+    `first_shoe` offsets the shoe ids so a batch can be one slice of a larger run.
+    """
+    def __init__(self, num_shoes, num_decks, rng, penetration=DECK_PENETRATION,
+                 shuffle_seed=None, first_shoe=0):
+        self.num_shoes = num_shoes
+        self.num_decks = num_decks
+        self.size = num_decks * 52
+        self.penetration = penetration
+        self.rng = rng
+        self.shuffle_seed = shuffle_seed
+        self.shoe_ids = np.arange(first_shoe, first_shoe + num_shoes)
+        self.shuffles = np.zeros(num_shoes, dtype=np.int64)
+        self._deck = np.repeat(np.arange(len(RANKS), dtype=np.int8), 4 * num_decks)
+        self.cards = np.empty((num_shoes, self.size), dtype=np.int8)
+        self.pos = np.zeros(num_shoes, dtype=np.int64)
+        self.running_count = np.zeros(num_shoes, dtype=np.int64)
+        self.reshuffle(np.arange(num_shoes))
+
+    def reshuffle(self, idx):
+        """Reshuffle the shoes listed in `idx` and reset their counts."""
+        if not idx.size:
+            return
+        if self.shuffle_seed is None:
+            self.cards[idx] = self.rng.permuted(np.tile(self._deck, (idx.size, 1)), axis=1)
+        else:
+            perms = keyed_permutations(self.shuffle_seed, self.shoe_ids[idx], self.shuffles[idx], self.size)
+            self.cards[idx] = self._deck[perms]
+        self.shuffles[idx] += 1
+        self.pos[idx] = 0
+        self.running_count[idx] = 0
+
+    def draw(self, idx):
+        """Draw one card from each shoe in `idx` and return their rank codes."""
+        self.reshuffle(idx[self.pos[idx] >= self.size])
+        cards = self.cards[idx, self.pos[idx]]
+        self.pos[idx] += 1
+        self.running_count[idx] += COUNT_VALUES[cards]
+        return cards
+
+    def needs_shuffle(self, idx):
+        remaining = self.size - self.pos[idx]
+        return (remaining / self.size) < (1 - self.penetration)
+
+    def get_true_count(self, idx):
+        decks_remaining = np.maximum((self.size - self.pos[idx]) / 52, 0.5)
+        return self.running_count[idx] / decks_remaining
+
+
+def play_batch_round(shoe, bankroll, idx, min_bet=MIN_BET, max_bet=MAX_BET,
+                     kelly=KELLY_FRACTION, variance=BJ_VARIANCE, table=STRATEGY):
+    """Play one hand in every shoe listed in `idx`; mirrors play_round. Returns the net result per hand.
+    `table` is a strategy.as_array() table (simulate_batch passes the one for the shoe's deck count)."""
+    shoe.reshuffle(idx[shoe.needs_shuffle(idx)])
+
+    # Bet
+    bet = decide_bets(bankroll[idx], shoe.get_true_count(idx), min_bet, max_bet, kelly, variance)
+    start = bankroll[idx]
+    cash = start - bet
+    stake = bet.copy()
+
+    # Deal
+    p1 = shoe.draw(idx)
+    d1 = shoe.draw(idx)
+    p2 = shoe.draw(idx)
+    up = shoe.draw(idx)
+    p_hard = HARD_VALUES[p1] + HARD_VALUES[p2]
+    p_aces = (p1 == ACE).astype(np.int16) + (p2 == ACE)
+    d_hard = HARD_VALUES[d1] + HARD_VALUES[up]
+    d_aces = (d1 == ACE).astype(np.int16) + (up == ACE)
+    num_cards = np.full(idx.size, 2)
+    dealer_val = RANK_VALUES[up]
+
+    # Check Naturals
+    p_bj = hand_values(p_hard, p_aces)[0] == 21
+    d_bj = hand_values(d_hard, d_aces)[0] == 21
+    cash[p_bj & d_bj] += bet[p_bj & d_bj]
+    p_only = p_bj & ~d_bj
+    cash[p_only] += bet[p_only] + (bet[p_only] * 1.5)
+
+    # Player Turn
+    playing = np.flatnonzero(~(p_bj | d_bj))
+    standing = []
+    while playing.size:
+        val, soft = hand_values(p_hard[playing], p_aces[playing])
+        two_cards = (num_cards[playing] == 2).astype(np.int8)
+        moves = table[soft.astype(np.int8), val, dealer_val[playing], two_cards, two_cards]
+
+        surrender = playing[moves == SURRENDER]
+        cash[surrender] += bet[surrender] * 0.5
+
+        doubles = playing[moves == DOUBLE]
+        can_double = cash[doubles] >= bet[doubles]
+        doubled = doubles[can_double]
+        cash[doubled] -= bet[doubled]
+        stake[doubled] += bet[doubled]
+
+        hits = np.concatenate([playing[moves == HIT], doubles[~can_double]])
+        drawing = np.concatenate([doubled, hits])
+        cards = shoe.draw(idx[drawing])
+        p_hard[drawing] += HARD_VALUES[cards]
+        p_aces[drawing] += cards == ACE
+        num_cards[drawing] += 1
+
+        standing.append(playing[moves == STAND])
+        standing.append(doubled)
+        playing = hits[hand_values(p_hard[hits], p_aces[hits])[0] <= 21]
+
+    # Dealer Turn
+    standing = np.concatenate(standing) if standing else np.empty(0, dtype=np.int64)
+    drawing = standing
+    while drawing.size:
+        drawing = drawing[hand_values(d_hard[drawing], d_aces[drawing])[0] < 17]
+        if drawing.size:
+            cards = shoe.draw(idx[drawing])
+            d_hard[drawing] += HARD_VALUES[cards]
+            d_aces[drawing] += cards == ACE
+
+    p_val = hand_values(p_hard[standing], p_aces[standing])[0]
+    d_val = hand_values(d_hard[standing], d_aces[standing])[0]
+    win = standing[(d_val > 21) | (p_val > d_val)]
+    push = standing[(d_val <= 21) & (p_val == d_val)]
+    cash[win] += stake[win] * 2
+    cash[push] += stake[push]
+
+    bankroll[idx] = cash
+    return cash - start
+
+
+def simulate_batch(num_shoes, rounds, num_decks=NUM_DECKS, starting_bankroll=STARTING_BANKROLL,
+                   penetration=DECK_PENETRATION, min_bet=MIN_BET, max_bet=MAX_BET,
+                   kelly=KELLY_FRACTION, variance=BJ_VARIANCE, seed=None, shuffle_seed=None, first_shoe=0):
+    """
+    Play `rounds` hands in each of `num_shoes` independent sessions at once.
+    Each session has its own shoe and bankroll and stops when it can no longer cover MIN_BET,
+    exactly like the loop in blackjack.py. `seed` may be an int, SeedSequence or Generator.
+    Pass `shuffle_seed` to use keyed shuffles (common random numbers across configurations).
+    """
+    rng = np.random.default_rng(seed)
+    table = strategy.as_array(strategy.rules_table(num_decks))
+    shoe = BatchShoe(num_shoes, num_decks, rng, penetration, shuffle_seed, first_shoe)
+    bankroll = np.full(num_shoes, float(starting_bankroll))
+    min_bankroll = bankroll.copy()
+    hands = np.zeros(num_shoes, dtype=np.int64)
+    net_sum = np.zeros(num_shoes)
+    net_sq_sum = np.zeros(num_shoes)
+
+    for _ in range(rounds):
+        idx = np.flatnonzero(bankroll >= min_bet)
+        if not idx.size:
+            break
+        net = play_batch_round(shoe, bankroll, idx, min_bet, max_bet, kelly, variance, table)
+        hands[idx] += 1
+        net_sum[idx] += net
+        net_sq_sum[idx] += net * net
+        np.minimum(min_bankroll, bankroll, out=min_bankroll)
+
+    return {
+        'bankroll': bankroll,
+        'min_bankroll': min_bankroll,
+        'hands': hands,
+        'net_sum': net_sum,
+        'net_sq_sum': net_sq_sum,
+        'ruined': bankroll < min_bet,
+    }
+
+
+def summarize(result, starting_bankroll=STARTING_BANKROLL):
+    """Collapse per-session arrays from simulate_batch into headline statistics."""
+    hands = result['hands'].sum()
+    ev = result['net_sum'].sum() / hands
+    variance = result['net_sq_sum'].sum() / hands - ev * ev
+    return {
+        'sessions': result['hands'].size,
+        'hands': int(hands),
+        'mean_final_bankroll': float(result['bankroll'].mean()),
+        'ev_per_hand': float(ev),
+        'std_per_hand': float(np.sqrt(max(variance, 0.0))),
+        'risk_of_ruin': float(result['ruined'].mean()),
+        'mean_profit': float(result['bankroll'].mean() - starting_bankroll),
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    stats = summarize(simulate_batch(10000, 1000, seed=0))
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {stats['hands']} hands in {elapsed:.2f}s ({stats['hands'] / elapsed:,.0f} hands/s)")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,241 @@
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+# Rank glyph templates learned from labeled frames by `python card_recognizer.py train <folder>`
+TEMPLATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card_templates.npz")
+RANKS = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+
+# --- Segmentation ---
+CARD_LEVEL = 200       # Grayscale above this counts as card face
+INK_LEVEL = 140        # Grayscale below this (inside a card) counts as ink; red suits are dark in grayscale too
+FILL = 0.3             # Fraction of a column/row that must be card face for it to belong to a card
+MIN_CARD_WIDTH = 8     # px; narrower bright runs are glare or UI, not cards
+MAX_ASPECT = 1.0       # Width / height above this means overlapping cards, which we don't split
+CORNER = 0.3           # Fraction of card width and height searched for the rank index
+
+# --- Matching ---
+GLYPH_SIZE = (16, 24)  # (width, height) glyphs are normalized to before matching
+MIN_CONFIDENCE = 0.2   # Best-minus-second correlation margin; below this analyze_image_bytes asks the model
+
+
+def split_frame(image, regions):
+    """Undo card_regions.crop_to_regions: return the (dealer, player) parts of an encoded frame."""
+    boxes = [regions["dealer"], regions["player"]]
+    width = max(right - left for left, _, right, _ in boxes)
+    dealer_height = round((boxes[0][3] - boxes[0][1]) * image.width / width)
+    return image.crop((0, 0, image.width, dealer_height)), image.crop((0, dealer_height, image.width, image.height))
+
+
+def _runs(mask):
+    """(start, stop) index pairs of the True runs in a 1-d bool array."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def find_cards(gray):
+    """Bounding boxes (left, top, right, bottom) of the cards in a grayscale array, left to right.
+    Returns None when a bright blob is too wide to be one card (overlapping fan)."""
+    face = gray > CARD_LEVEL
+    boxes = []
+    for left, right in _runs(face.mean(axis=0) > FILL):
+        if right - left < MIN_CARD_WIDTH:
+            continue
+        rows = _runs(face[:, left:right].mean(axis=1) > FILL)
+        if not rows:
+            continue
+        top, bottom = max(rows, key=lambda r: r[1] - r[0])
+        if (right - left) > MAX_ASPECT * (bottom - top):
+            return None
+        boxes.append((left, top, right, bottom))
+    return boxes
+
+
+def rank_glyph(gray, box):
+    """The rank index from a card's top-left corner as a GLYPH_SIZE float array, or None if it is blank."""
+    left, top, right, bottom = box
+    corner = gray[top:top + max(1, int((bottom - top) * CORNER)), left:left + max(1, int((right - left) * CORNER))]
+    ink = corner < INK_LEVEL
+    rows = _runs(ink.any(axis=1))
+    if not rows:
+        return None
+    # The rank sits above the suit pip; keep only the first block of inked rows
+    top_row, bottom_row = rows[0]
+    ink = ink[top_row:bottom_row]
+    cols = np.flatnonzero(ink.any(axis=0))
+    ink = ink[:, cols[0]:cols[-1] + 1]
+
+    from PIL import Image
+    glyph = Image.fromarray(ink.astype(np.uint8) * 255).resize(GLYPH_SIZE, Image.BILINEAR)
+    return np.asarray(glyph, dtype=np.float32) / 255
+
+
+def _normalize(glyphs):
+    """Zero-mean, unit-norm rows, so a dot product is the correlation coefficient."""
+    flat = glyphs.reshape(len(glyphs), -1)
+    flat = flat - flat.mean(axis=1, keepdims=True)
+    return flat / np.maximum(np.linalg.norm(flat, axis=1, keepdims=True), 1e-6)
+
+
+class CardRecognizer:
+    """
+    Reads card ranks from an encoded frame (card_regions.encode_frame output) on the CPU by
+    matching each card's corner index against per-rank templates.
+    Templates are the mean glyph of every labeled example seen by `train`.
+    """
+    def __init__(self, regions, min_confidence=MIN_CONFIDENCE):
+        self.regions = regions
+        self.min_confidence = min_confidence
+        self.sums = np.zeros((len(RANKS),) + GLYPH_SIZE[::-1], dtype=np.float32)
+        self.counts = np.zeros(len(RANKS), dtype=np.int32)
+        self._templates = None
+
+    @classmethod
+    def load(cls, regions, path=TEMPLATES_FILE, **kwargs):
+        """Recognizer with templates from `path`, or None if there are no templates or no regions."""
+        if not regions or not os.path.exists(path):
+            return None
+        recognizer = cls(regions, **kwargs)
+        with np.load(path) as data:
+            recognizer.sums = data["sums"]
+            recognizer.counts = data["counts"]
+        return recognizer
+
+    def save(self, path=TEMPLATES_FILE):
+        with open(path, "wb") as fh:
+            np.savez_compressed(fh, sums=self.sums, counts=self.counts)
+
+    def _sides(self, image_bytes):
+        from PIL import Image
+        image = Image.open(io.BytesIO(image_bytes)).convert("L")
+        return [np.asarray(side) for side in split_frame(image, self.regions)]
+
+    def _glyphs(self, gray):
+        boxes = find_cards(gray)
+        if boxes is None:
+            return None
+        return [rank_glyph(gray, box) for box in boxes]
+
+    def train(self, image_bytes, player_cards, dealer_cards):
+        """Add one labeled frame to the templates. Returns False (and learns nothing) if the
+        number of cards found does not match the labels."""
+        dealer_gray, player_gray = self._sides(image_bytes)
+        pairs = []
+        for gray, labels in ((dealer_gray, dealer_cards), (player_gray, player_cards)):
+            glyphs = self._glyphs(gray)
+            if glyphs is None or len(glyphs) != len(labels) or any(g is None for g in glyphs):
+                return False
+            pairs.extend(zip(glyphs, labels))
+        for glyph, label in pairs:
+            rank = RANKS.index(label)
+            self.sums[rank] += glyph
+            self.counts[rank] += 1
+        self._templates = None
+        return True
+
+    def _match(self, glyphs):
+        """(ranks, margins) for each glyph: the best template and how far it beats the runner-up."""
+        if self._templates is None:
+            self._templates = _normalize(self.sums / np.maximum(self.counts, 1)[:, None, None])
+        scores = _normalize(np.stack(glyphs)) @ self._templates.T
+        order = np.argsort(scores, axis=1)
+        rows = np.arange(len(glyphs))
+        best, second = order[:, -1], order[:, -2]
+        return [RANKS[i] for i in best], scores[rows, best] - scores[rows, second]
+
+    def recognize(self, image_bytes):
+        """Return (player_cards, dealer_cards, confidence) like analyze_image_bytes plus a score:
+        the smallest margin, over all cards, between the best and second-best template correlation.
+        It is 0 when the frame could not be segmented or some rank has no template yet (an untrained
+        rank would otherwise be read as whichever trained rank looks most like it)."""
+        if not self.counts.all():
+            return [], [], 0.0
+        sides = []
+        confidence = 1.0
+        for gray in self._sides(image_bytes):
+            glyphs = self._glyphs(gray)
+            if glyphs is None or any(g is None for g in glyphs):
+                return [], [], 0.0
+            if not glyphs:
+                sides.append([])
+                continue
+            ranks, margins = self._match(glyphs)
+            sides.append(ranks)
+            confidence = min(confidence, float(margins.min()))
+        dealer_cards, player_cards = sides
+        if not dealer_cards and not player_cards:
+            # An empty table and a failed segmentation look the same; let the model decide
+            confidence = 0.0
+        return player_cards, dealer_cards, confidence
+
+
+# --- Labeled fixtures ---
+# A fixture folder holds encoded frames plus labels.json:
+#   {"frame_001.jpeg": {"player": ["A", "10"], "dealer": ["K"]}, ...}
+
+def load_fixtures(folder):
+    with open(os.path.join(folder, "labels.json"), "r") as fh:
+        labels = json.load(fh)
+    for name, label in sorted(labels.items()):
+        with open(os.path.join(folder, name), "rb") as fh:
+            yield name, fh.read(), label["player"], label["dealer"]
+
+
+def train_folder(recognizer, folder):
+    """Train on every fixture in `folder`; returns the names that could not be used."""
+    return [name for name, data, player, dealer in load_fixtures(folder)
+            if not recognizer.train(data, player, dealer)]
+
+
+def evaluate(recognizer, folder):
+    """
+    Score the recognizer on a labeled fixture folder. A frame counts as accepted when its
+    confidence reaches min_confidence (no model call), and correct when both hands match exactly.
+    """
+    import time
+
+    report = {"frames": 0, "correct": 0, "accepted": 0, "accepted_wrong": 0, "ms_per_frame": 0.0, "errors": []}
+    elapsed = 0.0
+    for name, data, player, dealer in load_fixtures(folder):
+        start = time.perf_counter()
+        got_player, got_dealer, confidence = recognizer.recognize(data)
+        elapsed += time.perf_counter() - start
+        right = got_player == player and got_dealer == dealer
+        accepted = confidence >= recognizer.min_confidence
+        report["frames"] += 1
+        report["correct"] += right
+        report["accepted"] += accepted
+        report["accepted_wrong"] += accepted and not right
+        if not right:
+            report["errors"].append({"frame": name, "player": got_player, "dealer": got_dealer,
+                                     "confidence": round(confidence, 3)})
+    if report["frames"]:
+        report["ms_per_frame"] = elapsed * 1000 / report["frames"]
+    return report
+
+
+if __name__ == "__main__":
+    from card_regions import load_regions
+
+    if len(sys.argv) == 3 and sys.argv[1] in ("train", "evaluate"):
+        regions = load_regions()
+        if not regions:
+            sys.exit("No card regions; run `python card_regions.py calibrate` first")
+        if sys.argv[1] == "train":
+            recognizer = CardRecognizer.load(regions) or CardRecognizer(regions)
+            skipped = train_folder(recognizer, sys.argv[2])
+            recognizer.save()
+            print(f"Saved templates to {TEMPLATES_FILE}; examples per rank: "
+                  f"{dict(zip(RANKS, recognizer.counts.tolist()))}")
+            if skipped:
+                print(f"Skipped (card count did not match labels): {skipped}")
+        else:
+            recognizer = CardRecognizer.load(regions)
+            if recognizer is None:
+                sys.exit(f"No templates at {TEMPLATES_FILE}; run `python card_recognizer.py train <folder>` first")
+            print(json.dumps(evaluate(recognizer, sys.argv[2]), indent=2))
+    else:
+        print("usage: python card_recognizer.py train <fixtures> | evaluate <fixtures>")
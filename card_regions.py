@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import sys
+import time
+
+# Saved by `python card_regions.py calibrate`; boxes are (left, top, right, bottom) in screen pixels
+REGIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regions.json")
+MAX_WIDTH = 1024      # Uploaded image is scaled down to at most this width
+JPEG_QUALITY = 80
+MIMES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def load_regions(path=REGIONS_FILE):
+    """Return {'dealer': box, 'player': box} from `path`, or None when not calibrated yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as fh:
+        data = json.load(fh)
+    return {side: tuple(data[side]) for side in ("dealer", "player")}
+
+
+def save_regions(regions, path=REGIONS_FILE):
+    with open(path, "w") as fh:
+        json.dump({side: list(box) for side, box in regions.items()}, fh, indent=2)
+
+
+def calibrate_regions(path=REGIONS_FILE):
+    """Interactively record the dealer and player card areas from the mouse position."""
+    import pyautogui
+
+    regions = {}
+    for side in ("dealer", "player"):
+        corners = []
+        for corner in ("top-left", "bottom-right"):
+            input(f"Move the mouse to the {corner} corner of the {side}'s cards and press Enter...")
+            corners.append(tuple(pyautogui.position()))
+        (left, top), (right, bottom) = corners
+        regions[side] = (min(left, right), min(top, bottom), max(left, right), max(top, bottom))
+        print(f"{side}: {regions[side]}")
+    save_regions(regions, path)
+    print(f"Saved regions to {path}")
+    return regions
+
+
+def crop_to_regions(image, regions):
+    """Stack the dealer crop above the player crop, keeping the layout the prompt describes."""
+    from PIL import Image
+
+    crops = [image.crop(regions["dealer"]), image.crop(regions["player"])]
+    width = max(c.width for c in crops)
+    stacked = Image.new("RGB", (width, sum(c.height for c in crops)))
+    top = 0
+    for crop in crops:
+        stacked.paste(crop, (0, top))
+        top += crop.height
+    return stacked
+
+
+def encode_frame(image, regions=None, max_width=MAX_WIDTH, fmt="JPEG", quality=JPEG_QUALITY):
+    """Crop (when `regions` is given), downscale and encode a PIL image. Returns (bytes, mime)."""
+    from PIL import Image
+
+    if regions:
+        image = crop_to_regions(image, regions)
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    if fmt == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, quality=quality)
+    return buf.getvalue(), MIMES[fmt]
+
+
+def measure_payload(image, regions, max_width=MAX_WIDTH, quality=JPEG_QUALITY):
+    """Bytes and encode time of the full frame (as uploaded before) versus the cropped, downscaled one."""
+    report = {}
+    for name, kwargs in (("full", {"regions": None, "max_width": None, "quality": 75}),
+                         ("roi", {"regions": regions, "max_width": max_width, "quality": quality})):
+        start = time.perf_counter()
+        data, _ = encode_frame(image, **kwargs)
+        report[name] = {"bytes": len(data), "encode_ms": (time.perf_counter() - start) * 1000}
+    report["bytes_saved"] = 1 - report["roi"]["bytes"] / report["full"]["bytes"]
+    return report
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["calibrate"]:
+        calibrate_regions()
+    elif sys.argv[1:2] == ["measure"] and len(sys.argv) == 3:
+        from PIL import Image
+        print(json.dumps(measure_payload(Image.open(sys.argv[2]), load_regions()), indent=2))
+    else:
+        print("usage: python card_regions.py calibrate | measure <screenshot>")
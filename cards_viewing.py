@@ -3,8 +3,9 @@ import time
 import json
 import re
 from collections import Counter
-from google import genai
-from google.genai import types
+
+import metrics
+from blackjack_agent import RANKS, UNKNOWN, card_code
 
 # Use folder relative to this script
 img_dir = os.path.join(os.path.dirname(__file__), "img")
@@ -46,12 +47,23 @@ def _load_env_file():
         return
 
 
-_load_env_file()
-_api_key = os.environ.get("GEMINI_API_KEY")
-if _api_key:
-    client = genai.Client(api_key=_api_key)
-else:
-    client = None
+# Created on first use by get_client(); google.genai is slow to import, so nothing loads it at import time
+client = None
+
+
+def get_client():
+    """Return the shared Gemini client, creating it (and importing google.genai) on first call."""
+    global client
+    if client is None:
+        _load_env_file()
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError(
+                "GEMINI_API_KEY is not set. Set the environment variable or add a .env file with GEMINI_API_KEY."
+            )
+        from google import genai
+        client = genai.Client(api_key=api_key)
+    return client
 
 # Keep the last-seen card lists for player and dealer
 prev_player = []
@@ -71,67 +83,173 @@ PROMPT = (
     "If no cards are visible for a side, return {\"count\": 0, \"cards\": []} for that side. RETURN ONLY THE JSON OBJECT."
 )
 
+# Characters that can change brace depth or string state; everything else is skipped in bulk
+_STRUCTURE = re.compile(r'[{}"\\]')
+# A JSON object opens with a key or closes immediately; cheaper to check than a failed json.loads
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_DECODER = json.JSONDecoder()
+
+
 def extract_json(text: str):
-    """Try to extract a JSON object from text. Returns parsed object or raises ValueError."""
-    # Quick attempt if the response is clean
-    text = text.strip()
-    # If it already looks like JSON
-    if text.startswith("{") and text.endswith("}"):
-        return json.loads(text)
-    # Try to find a {...} substring
-    m = re.search(r"(\{.*\})", text, re.DOTALL)
-    if m:
-        candidate = m.group(1)
-        # Try progressively shorter tails to handle trailing markdown or backticks
-        start = candidate.find("{")
-        for end in range(len(candidate), start, -1):
-            try:
-                return json.loads(candidate[:end])
-            except Exception:
+    """Return the first complete JSON object in `text`, ignoring prose, code fences and trailing chatter.
+
+    One decode attempt from the first brace, then (if that fails) a single pass that matches braces,
+    skipping string contents, and hands each balanced {...} span to json.loads at most once,
+    so the cost is linear in len(text). A stray "{" in the prose that never closes does not hide
+    the answer: the balanced spans directly inside unclosed braces are tried at the end.
+    Raises ValueError if no complete object is found (e.g. a truncated response).
+    """
+    # Usual case: the first brace opens the answer, so decode from there and ignore what follows
+    first = text.find("{")
+    if first < 0:
+        raise ValueError("No valid JSON found in response")
+    parsed = _decode_object(text, first, None)
+    if parsed is not None:
+        return parsed
+
+    stack = []        # Indexes (into `opened`) of the braces still open
+    opened = []       # (position, parent index) of every "{" seen outside strings
+    closed = {}       # Opened index -> position of its matching "}"
+    in_string = False
+    skip = -1
+    for m in _STRUCTURE.finditer(text):
+        pos = m.start()
+        if pos == skip:
+            continue
+        ch = m.group()
+        if in_string:
+            if ch == "\\":
+                skip = pos + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == "{":
+            opened.append((pos, stack[-1] if stack else None))
+            stack.append(len(opened) - 1)
+        elif not stack:
+            # Quotes, backslashes and stray closing braces in prose outside any object
+            continue
+        elif ch == '"':
+            in_string = True
+        elif ch == "}":
+            index = stack.pop()
+            if stack:
+                closed[index] = pos
                 continue
+            start = opened[index][0]
+            if _OBJECT_START.match(text, start):
+                parsed = _decode_object(text, start, pos + 1)
+                if parsed is not None:
+                    return parsed
+
+    # Unclosed braces left: their direct balanced children never reached depth 0. They are
+    # disjoint spans, so trying each once keeps the whole thing linear.
+    unclosed = set(stack)
+    for index, end in sorted(closed.items()):
+        start, parent = opened[index]
+        if parent in unclosed and _OBJECT_START.match(text, start):
+            parsed = _decode_object(text, start, end + 1)
+            if parsed is not None:
+                return parsed
     raise ValueError("No valid JSON found in response")
-def analyze_image_bytes(image_bytes: bytes, mime: str):
-    """Analyze image bytes with the Gemini model and return (player_cards, dealer_cards).
 
-    Raises ValueError on parsing/validation errors or other exceptions from the client.
+
+def _decode_object(text, start, end):
+    """The dict decoded from text[start:end] (end=None: from `start`, ignoring what follows), or None."""
+    try:
+        if end is None:
+            parsed, _ = _DECODER.raw_decode(text, start)
+        else:
+            parsed = json.loads(text[start:end])
+    except (ValueError, RecursionError):
+        # RecursionError: nesting deeper than the decoder can follow is as unusable as malformed JSON
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def validate_hands(parsed):
+    """Check one {"player": {...}, "dealer": {...}} object and return (player_cards, dealer_cards).
+
+    Ranks are normalized to A,2-10,J,Q,K. Raises ValueError if a side is missing, `cards` is not
+    a list, `count` disagrees with the number of cards, or a card is not a recognizable rank.
     """
-    print("Analyzing image bytes")
-    if client is None:
-        raise RuntimeError(
-            "GEMINI_API_KEY is not set. Set the environment variable or add a .env file with GEMINI_API_KEY."
-        )
+    if not isinstance(parsed, dict):
+        raise ValueError(f"expected a player/dealer object, got: {parsed}")
+    hands = []
+    for side in ("player", "dealer"):
+        obj = parsed.get(side)
+        if not isinstance(obj, dict):
+            raise ValueError(f"parsed JSON missing '{side}' object: {parsed}")
+        cards = obj.get("cards", [])
+        if not isinstance(cards, list):
+            raise ValueError(f"'cards' for {side} is not a list: {parsed}")
+        count = obj.get("count", len(cards))
+        if count != len(cards):
+            raise ValueError(f"{side} count {count!r} does not match {len(cards)} cards: {parsed}")
+        codes = [card_code(str(card)) for card in cards]
+        if UNKNOWN in codes:
+            raise ValueError(f"unrecognized card in {side}: {cards}")
+        hands.append([RANKS[code] for code in codes])
+    return hands[0], hands[1]
 
-    response = client.models.generate_content(
-        model="gemini-3-flash-preview",
-        contents=[
-            types.Part.from_bytes(data=image_bytes, mime_type=mime),
-            PROMPT,
-        ],
-    )
 
-    raw = response.text
-    print(raw)
-    parsed = extract_json(raw)
+def parse_response(text: str):
+    """Extract and validate the model's single-image reply; returns (player_cards, dealer_cards)."""
+    return validate_hands(extract_json(text))
+
 
-    if not isinstance(parsed, dict) or "player" not in parsed or "dealer" not in parsed:
-        raise ValueError(f"parsed JSON missing 'player' or 'dealer' keys: {parsed}")
+def analyze_image_bytes(image_bytes: bytes, mime: str, cache=None, recognizer=None):
+    """Analyze image bytes with the Gemini model and return (player_cards, dealer_cards).
 
-    player_obj = parsed.get("player", {})
-    dealer_obj = parsed.get("dealer", {})
+    With `cache` (a frame_cache.FrameCache), a frame identical to a recently analyzed one
+    returns the cached result without calling the model.
+    With `recognizer` (a card_recognizer.CardRecognizer), the frame is first read locally and
+    the model is only called when the local confidence is below recognizer.min_confidence.
+    Raises ValueError on parsing/validation errors or other exceptions from the client.
+    """
+    if cache is not None:
+        key = cache.hash(image_bytes)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.incr("cache_hits")
+            return list(cached[0]), list(cached[1])
 
-    player_cards = player_obj.get("cards", [])
-    dealer_cards = dealer_obj.get("cards", [])
+    if recognizer is not None:
+        with metrics.span("recognize"):
+            player_cards, dealer_cards, confidence = recognizer.recognize(image_bytes)
+        if confidence >= recognizer.min_confidence:
+            metrics.incr("local_reads")
+            if cache is not None:
+                cache.put(key, (player_cards, dealer_cards))
+            return player_cards, dealer_cards
+        print(f"Local read not confident ({confidence:.2f}); asking the model")
 
-    if not isinstance(player_cards, list) or not isinstance(dealer_cards, list):
-        raise ValueError(f"'cards' for player or dealer is not a list: {parsed}")
+    print("Analyzing image bytes")
+    metrics.incr("model_calls")
+    with metrics.span("model_request"):
+        # Plain-dict image part: the SDK accepts it as-is, and stand-in clients (replay.py) need no google.genai
+        response = get_client().models.generate_content(
+            model="gemini-3-flash-preview",
+            contents=[
+                {"inline_data": {"data": image_bytes, "mime_type": mime}},
+                PROMPT,
+            ],
+        )
 
-    normalized_player = [str(c).strip() for c in player_cards]
-    normalized_dealer = [str(c).strip() for c in dealer_cards]
+    raw = response.text
+    print(raw)
+    try:
+        with metrics.span("parse"):
+            normalized_player, normalized_dealer = parse_response(raw)
+    except ValueError:
+        metrics.incr("parse_failures")
+        raise
 
+    if cache is not None:
+        cache.put(key, (normalized_player, normalized_dealer))
     return normalized_player, normalized_dealer
 
 
-def analyze_image_file(path: str):
+def analyze_image_file(path: str, cache=None):
     print("Reached")
     """Read an image file from `path` and return (player_cards, dealer_cards)."""
     if not os.path.exists(path):
@@ -151,7 +269,167 @@ def analyze_image_file(path: str):
         image_bytes = f.read()
 
     print("Anazlyzing")
-    return analyze_image_bytes(image_bytes, mime)
+    return analyze_image_bytes(image_bytes, mime, cache)
+
+
+
+# --- Batched requests ---
+# Several frames (or several tables' crops) in one generate_content call: one round trip instead of N
+
+MAX_BATCH = 4          # Images per request; more makes each reply slower and reads less reliable
+FLUSH_TIMEOUT = 0.15   # Seconds the first queued image waits for company before its batch is sent anyway
+
+BATCH_PROMPT = (
+    "You are given {n} images of a blackjack table, numbered 1 to {n} in the order they appear. "
+    "In each image cards may be visible for the player (bottom side) and the dealer (across from the player). "
+    "Return ONLY valid JSON with one top-level key \"images\": an array of exactly {n} objects, one per image "
+    "in the same order, each with two keys \"player\" and \"dealer\". Each of those is an object with:\n"
+    "  - count: integer number of cards detected for that side\n"
+    "  - cards: array of card ranks as strings (use A,2,3,4,5,6,7,8,9,10,J,Q,K)\n"
+    "Example for 2 images: {{\"images\": [{{\"player\": {{\"count\": 2, \"cards\": [\"A\", \"10\"]}}, "
+    "\"dealer\": {{\"count\": 1, \"cards\": [\"K\"]}}}}, {{\"player\": {{\"count\": 0, \"cards\": []}}, "
+    "\"dealer\": {{\"count\": 0, \"cards\": []}}}}]}}\n"
+    "If no cards are visible for a side, use {{\"count\": 0, \"cards\": []}}. RETURN ONLY THE JSON OBJECT."
+)
+
+
+def parse_batch_response(text: str, n: int):
+    """
+    Parse a batched reply into a list of `n` entries, each (player_cards, dealer_cards) or the
+    ValueError that image's entry failed validation with, so one bad read does not sink the batch.
+    Raises ValueError if the reply has no "images" array of length `n`.
+    """
+    parsed = extract_json(text)
+    images = parsed.get("images")
+    if not isinstance(images, list) or len(images) != n:
+        raise ValueError(f"expected an 'images' array of {n} entries: {parsed}")
+    results = []
+    for entry in images:
+        try:
+            results.append(validate_hands(entry))
+        except ValueError as e:
+            results.append(e)
+    return results
+
+
+def analyze_images_bytes(images, cache=None):
+    """
+    Analyze a list of (image_bytes, mime) in one model request (cache hits are not sent).
+    Returns one entry per image like parse_batch_response: (player_cards, dealer_cards) or a ValueError.
+    """
+    results = [None] * len(images)
+    keys = [None] * len(images)
+    pending = []
+    for i, (image_bytes, _) in enumerate(images):
+        if cache is not None:
+            keys[i] = cache.hash(image_bytes)
+            cached = cache.get(keys[i])
+            if cached is not None:
+                metrics.incr("cache_hits")
+                results[i] = (list(cached[0]), list(cached[1]))
+                continue
+        pending.append(i)
+    if not pending:
+        return results
+
+    print(f"Analyzing {len(pending)} images in one request")
+    metrics.incr("model_calls")
+    metrics.incr("batched_images", len(pending))
+    contents = [{"inline_data": {"data": images[i][0], "mime_type": images[i][1]}} for i in pending]
+    contents.append(BATCH_PROMPT.format(n=len(pending)))
+    with metrics.span("model_request"):
+        response = get_client().models.generate_content(model="gemini-3-flash-preview", contents=contents)
+
+    raw = response.text
+    print(raw)
+    try:
+        with metrics.span("parse"):
+            parsed = parse_batch_response(raw, len(pending))
+    except ValueError:
+        metrics.incr("parse_failures")
+        raise
+
+    for i, result in zip(pending, parsed):
+        results[i] = result
+        if isinstance(result, ValueError):
+            metrics.incr("parse_failures")
+        elif cache is not None:
+            cache.put(keys[i], result)
+    return results
+
+
+class FrameBatcher:
+    """
+    Collects images submitted from any thread and sends them in batches of up to `max_batch`.
+    A batch goes out when it is full or `flush_timeout` seconds after its first image arrived,
+    whichever is first. submit() returns a concurrent.futures.Future resolving to
+    (player_cards, dealer_cards), or raising ValueError for an unreadable image.
+    """
+    def __init__(self, max_batch=MAX_BATCH, flush_timeout=FLUSH_TIMEOUT, cache=None):
+        import queue
+        import threading
+
+        self.max_batch = max_batch
+        self.flush_timeout = flush_timeout
+        self.cache = cache
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, image_bytes, mime):
+        from concurrent.futures import Future
+
+        future = Future()
+        self._queue.put((image_bytes, mime, future))
+        return future
+
+    def analyze(self, image_bytes, mime, timeout=None):
+        """Blocking submit: wait for this image's result."""
+        return self.submit(image_bytes, mime).result(timeout)
+
+    def close(self):
+        """Send what is queued and stop the worker thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        import queue
+
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_timeout
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            self._send(batch)
+
+    def _send(self, batch):
+        futures = [future for _, _, future in batch]
+        try:
+            results = analyze_images_bytes([(image_bytes, mime) for image_bytes, mime, _ in batch], self.cache)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
 
 
-__all__ = ["analyze_image_file", "analyze_image_bytes", "extract_json"]
+__all__ = ["analyze_image_file", "analyze_image_bytes", "analyze_images_bytes", "extract_json",
+           "parse_response", "parse_batch_response", "FrameBatcher"]
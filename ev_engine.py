@@ -0,0 +1,259 @@
+from collections import OrderedDict
+
+# --- Composition ---
+# A shoe composition is 10 counts indexed by card value: index 0 = 2s ... 8 = tens/faces, 9 = Aces.
+TEN, ACE = 8, 9
+HARD_VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10, 1]   # Ace as 1
+DEALER_OUTCOMES = [17, 18, 19, 20, 21, 'BUST']
+# Cards drawn during a recursion are tracked as one int (5 bits per value) so memo keys stay cheap
+DRAWN_KEYS = [1 << (5 * i) for i in range(10)]
+
+
+def value_index(value):
+    """Composition index for a card value 2-11 (Ace = 11)."""
+    return value - 2
+
+
+def full_shoe(num_decks):
+    return [4 * num_decks] * 8 + [16 * num_decks, 4 * num_decks]
+
+
+def _peeked(up):
+    """The hole card value ruled out by the peek (a ten under an Ace, an Ace under a ten), or None."""
+    return TEN if up == ACE else ACE if up == TEN else None
+
+
+def _hand_value(hard, ace):
+    if ace and hard + 10 <= 21:
+        return hard + 10, True
+    return hard, False
+
+
+class EVEngine:
+    """
+    Composition-dependent expected values for stand, hit, double and surrender.
+
+    `counts` is the remaining (unseen) shoe. Feed it with remove_card as cards appear,
+    including the player's own cards and the dealer upcard.
+    Dealer final-total distributions are exact for the given composition, conditioned on
+    the dealer not holding blackjack (the hole card is peeked before the player acts).
+    They are memoized by (upcard, hole card, composition) in a bounded LRU cache.
+    Against an Ace or a ten the player's EVs are averaged over the hole cards the peek
+    leaves possible, with that card out of the shoe the player draws from.
+    Player draws remove cards from the composition as they go. A double's dealer
+    distribution is taken after its one card; a hit's is taken from the composition at
+    decision time, the usual composition-dependent approximation.
+    """
+    def __init__(self, num_decks=1, hit_soft_17=False, surrender=True, cache_size=4096):
+        self.num_decks = num_decks
+        self.hit_soft_17 = hit_soft_17
+        self.surrender = surrender
+        self.cache_size = cache_size
+        self._dealer_cache = OrderedDict()
+        self.reset()
+
+    def reset(self):
+        self.counts = full_shoe(self.num_decks)
+
+    def remove_card(self, value):
+        """Remove one card of `value` (2-11) from the composition; ignored if none are left."""
+        i = value_index(value)
+        if self.counts[i] > 0:
+            self.counts[i] -= 1
+
+    def add_card(self, value):
+        self.counts[value_index(value)] += 1
+
+    # --- Dealer ---
+
+    def dealer_probabilities(self, upcard_value, counts=None, hole=None):
+        """Probabilities of the dealer finishing on 17, 18, 19, 20, 21 or busting.
+        `hole` is the composition index of a known hole card, already removed from `counts`."""
+        counts = list(self.counts if counts is None else counts)
+        key = (upcard_value, hole, tuple(counts))
+        cached = self._dealer_cache.get(key)
+        if cached is not None:
+            self._dealer_cache.move_to_end(key)
+            return cached
+
+        up = value_index(upcard_value)
+        if hole is None:
+            result = tuple(self._dealer_draw(HARD_VALUES[up], up == ACE, counts, sum(counts), _peeked(up), 0, {}))
+        else:
+            result = tuple(self._dealer_draw(HARD_VALUES[up] + HARD_VALUES[hole], ACE in (up, hole), counts,
+                                             sum(counts), None, 0, {}))
+
+        self._dealer_cache[key] = result
+        if len(self._dealer_cache) > self.cache_size:
+            self._dealer_cache.popitem(last=False)
+        return result
+
+    def _dealer_draw(self, hard, ace, counts, total, excluded, drawn, memo):
+        value, soft = _hand_value(hard, ace)
+        if value > 21:
+            return [0.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+        if value >= 17 and not (value == 17 and soft and self.hit_soft_17):
+            result = [0.0] * 6
+            result[value - 17] = 1.0
+            return result
+
+        if drawn in memo:
+            return memo[drawn]
+
+        result = [0.0] * 6
+        denom = total - (counts[excluded] if excluded is not None else 0)
+        if denom <= 0:
+            return result
+        for i in range(10):
+            n = counts[i]
+            if not n or i == excluded:
+                continue
+            p = n / denom
+            counts[i] -= 1
+            sub = self._dealer_draw(hard + HARD_VALUES[i], ace or i == ACE, counts, total - 1, None,
+                                    drawn + DRAWN_KEYS[i], memo)
+            counts[i] += 1
+            for k in range(6):
+                result[k] += p * sub[k]
+
+        if excluded is None:
+            memo[drawn] = result
+        return result
+
+    # --- Player ---
+
+    @staticmethod
+    def stand_ev(player_value, dealer_probs):
+        if player_value > 21:
+            return -1.0
+        ev = dealer_probs[5]
+        for k in range(5):
+            total = 17 + k
+            if player_value > total:
+                ev += dealer_probs[k]
+            elif player_value < total:
+                ev -= dealer_probs[k]
+        return ev
+
+    def _best_ev(self, hard, ace, counts, total, stand, drawn, memo):
+        """EV of playing on optimally (stand or keep hitting) from this hand."""
+        value, _ = _hand_value(hard, ace)
+        if value > 21:
+            return -1.0
+        if value == 21:
+            return stand[21]
+        return max(stand[value], self._hit_ev(hard, ace, counts, total, stand, drawn, memo))
+
+    def _hit_ev(self, hard, ace, counts, total, stand, drawn, memo):
+        if drawn in memo:
+            return memo[drawn]
+        ev = 0.0
+        for i in range(10):
+            n = counts[i]
+            if not n:
+                continue
+            counts[i] -= 1
+            ev += n / total * self._best_ev(hard + HARD_VALUES[i], ace or i == ACE, counts, total - 1,
+                                            stand, drawn + DRAWN_KEYS[i], memo)
+            counts[i] += 1
+        memo[drawn] = ev
+        return ev
+
+    def _double_ev(self, hard, ace, counts, total, dealer_value, hole):
+        ev = 0.0
+        for i in range(10):
+            n = counts[i]
+            if n:
+                value, _ = _hand_value(hard + HARD_VALUES[i], ace or i == ACE)
+                if value > 21:
+                    ev -= n / total
+                    continue
+                counts[i] -= 1
+                ev += n / total * self.stand_ev(value, self.dealer_probabilities(dealer_value, counts, hole))
+                counts[i] += 1
+        return 2 * ev
+
+    # After a peek the hole card is one of the unseen non-peeked cards, so it is not in the shoe
+    # the player draws from. The player cannot see it either: every decision below weighs the
+    # possible holes by how many of each are still unseen (n_h / W), and the next card is i with
+    # probability n_i * (1 - [i may be the hole] / W) / (total - 1). Each hole's dealer
+    # distribution is the one at decision time, as for an unpeeked hole.
+
+    def _best_ev_peeked(self, hard, ace, counts, total, peek, holes, drawn, memo):
+        value, _ = _hand_value(hard, ace)
+        if value > 21:
+            return -1.0
+        weight = total - counts[peek]
+        stand = sum(counts[i] * hole_stand[value] for i, hole_stand in holes) / weight
+        if value == 21:
+            return stand
+        return max(stand, self._hit_ev_peeked(hard, ace, counts, total, peek, holes, drawn, memo))
+
+    def _hit_ev_peeked(self, hard, ace, counts, total, peek, holes, drawn, memo):
+        if drawn in memo:
+            return memo[drawn]
+        weight = total - counts[peek]
+        if weight <= 0 or total < 2:
+            return -1.0
+        ev = 0.0
+        for i in range(10):
+            n = counts[i]
+            if not n:
+                continue
+            p = n * (1 - (i != peek) / weight) / (total - 1)
+            if not p:
+                continue
+            counts[i] -= 1
+            ev += p * self._best_ev_peeked(hard + HARD_VALUES[i], ace or i == ACE, counts, total - 1,
+                                           peek, holes, drawn + DRAWN_KEYS[i], memo)
+            counts[i] += 1
+        memo[drawn] = ev
+        return ev
+
+    def _peeked_evs(self, hard, ace, dealer_value, can_double, counts, total, peek):
+        """Hit (and double) EVs against an upcard whose hole card was peeked."""
+        holes = []
+        double = 0.0
+        for i in range(10):
+            n = counts[i]
+            if not n or i == peek:
+                continue
+            counts[i] -= 1
+            hole_probs = self.dealer_probabilities(dealer_value, counts, i)
+            holes.append((i, [self.stand_ev(v, hole_probs) for v in range(22)]))
+            if can_double:
+                # Nothing is decided after the double card, so averaging over holes is exact
+                double += n * self._double_ev(hard, ace, counts, total - 1, dealer_value, i)
+            counts[i] += 1
+        evs = {'HIT': self._hit_ev_peeked(hard, ace, counts, total, peek, holes, 0, {})}
+        if can_double:
+            evs['DOUBLE'] = double / (total - counts[peek])
+        return evs
+
+    def evaluate(self, hard_total, has_ace, dealer_value, can_double=True, can_surrender=True, counts=None):
+        """
+        Return {move: EV per unit bet} for the legal moves.
+        The hand is given as its hard total (Aces as 1) and whether it holds an Ace.
+        """
+        counts = list(self.counts if counts is None else counts)
+        total = sum(counts)
+        dealer_probs = self.dealer_probabilities(dealer_value, counts)
+        stand = [self.stand_ev(v, dealer_probs) for v in range(22)]
+        value, _ = _hand_value(hard_total, has_ace)
+
+        evs = {'STAND': self.stand_ev(value, dealer_probs)}
+        if total and value < 21:
+            peek = _peeked(value_index(dealer_value))
+            if peek is None:
+                evs['HIT'] = self._hit_ev(hard_total, has_ace, counts, total, stand, 0, {})
+                if can_double:
+                    evs['DOUBLE'] = self._double_ev(hard_total, has_ace, counts, total, dealer_value, None)
+            elif total > counts[peek]:
+                evs.update(self._peeked_evs(hard_total, has_ace, dealer_value, can_double, counts, total, peek))
+        if can_surrender and self.surrender:
+            evs['SURRENDER'] = -0.5
+        return evs
+
+    def best_move(self, hard_total, has_ace, dealer_value, can_double=True, can_surrender=True, counts=None):
+        evs = self.evaluate(hard_total, has_ace, dealer_value, can_double, can_surrender, counts)
+        return max(evs, key=evs.get)
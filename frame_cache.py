@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+CAPACITY = 256
+
+
+def frame_key(image_bytes):
+    """Exact key for an encoded frame: any changed pixel in the card crop gives a different key.
+    (A perceptual hash is not enough here: it sees where cards sit, not which ranks they show.)"""
+    return int.from_bytes(hashlib.blake2b(image_bytes, digest_size=16).digest(), 'big')
+
+
+class FrameCache:
+    """
+    LRU cache of (player_cards, dealer_cards) keyed by the exact frame bytes, so an unchanged
+    table skips the model call. In memory only unless `path` is given; then load() runs at
+    startup and save() writes the file when called (never on the per-frame path).
+    """
+    def __init__(self, capacity=CAPACITY, path=None):
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if path and os.path.exists(path):
+            self.load()
+
+    def hash(self, image_bytes):
+        return frame_key(image_bytes)
+
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            # A missing or corrupt cache file just means a cold cache
+            return
+        for key, (player, dealer) in data.items():
+            self._entries[int(key, 16)] = (player, dealer)
+
+    def save(self):
+        data = {f'{key:x}': [player, dealer] for key, (player, dealer) in self._entries.items()}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(data, fh)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self._entries)
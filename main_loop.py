@@ -1,14 +1,61 @@
+import asyncio
 import os
 import time
-from screenshot import capture_and_save_to_out
+from concurrent.futures import ThreadPoolExecutor
+from screenshot import capture_frame
 from blackjack_agent import BlackjackAgent
 import cards_viewing
 from collections import Counter
 from message import post_comment_with_mouse
+from frame_cache import FrameCache
+from card_regions import MAX_WIDTH, load_regions
+import metrics
 
-agent = BlackjackAgent(num_decks=1)
+NUM_DECKS = 1
+agent = BlackjackAgent(num_decks=NUM_DECKS)
+# Consecutive frames of the same table are usually identical; skip the model call for those (in memory only)
+frame_cache = FrameCache()
+# Card areas from `python card_regions.py calibrate`; None means upload the whole screen at full resolution
+regions = load_regions()
+# Local card reader, loaded in main() (it pulls in NumPy); None means every read goes to the model
+recognizer = None
 prev_player_hand = []
 prev_dealer_hand = []
+# Whether the action taken in this round ended it (the dealer draws nothing after a surrender)
+round_over = False
+# Count state from before the last frame was applied, plus the hands and round_over of the frame
+# before it, for rolling back a misread
+last_frame = (agent.snapshot(), [], [], False)
+
+# --- Pipeline timing (seconds) ---
+CAPTURE_INTERVAL = 1.0     # Time between screenshots; the analyzer always takes the newest one
+CAPTURE_TIMEOUT = 5
+ANALYZE_TIMEOUT = 20
+ACTION_TIMEOUT = 15
+DECISION_DEADLINE = 30     # Actions for frames older than this are dropped instead of typed
+# Frames stay in memory; set to e.g. os.path.join("img", "curr_board.jpeg") to also write each one for debugging
+DEBUG_FRAME = None
+
+# --- Metrics ---
+# Per-stage latency percentiles and counters, rewritten every METRICS_EVERY seconds
+METRICS_FILE = os.path.join("img", "metrics.json")
+METRICS_EVERY = 10
+METRICS_PORT = None        # e.g. 9100 to also serve them at http://127.0.0.1:9100/metrics
+
+# --- Recording ---
+# Set to a directory to log every frame, model reply, delta and action for `python replay.py <dir>`
+RECORD_DIR = None
+session = None
+
+
+def reset_state(num_decks=NUM_DECKS):
+    """Fresh count and empty previous hands, as at startup (used by replay.py between runs)."""
+    global agent, prev_player_hand, prev_dealer_hand, round_over, last_frame
+    agent = BlackjackAgent(num_decks=num_decks)
+    prev_player_hand = []
+    prev_dealer_hand = []
+    round_over = False
+    last_frame = (agent.snapshot(), [], [], False)
 
 def get_card_deltas(current, previous):
     # return multiset of newly observed cards (as a list)
@@ -21,28 +68,194 @@ def get_card_deltas(current, previous):
         result.extend([rank] * cnt)
     return result
 
-while(True):
-    time.sleep(10)
 
-    path_to_image = capture_and_save_to_out("curr_board.jpeg")
-    try:
-        current_player_hand, current_dealer_hand = cards_viewing.analyze_image_file(path_to_image)
-    except Exception as e:
-        print(f"Failed to analyze image {path_to_image}: {e}")
-        continue
+def carries_on(current_player, current_dealer, previous_player, previous_dealer):
+    """True if every card of the previous frame is still on the table (within a round hands only grow)."""
+    return not get_card_deltas(previous_player, current_player) and not get_card_deltas(previous_dealer, current_dealer)
+
+
+def is_misread(current_player, current_dealer, previous_player, previous_dealer, earlier_player, earlier_dealer):
+    # Cards leaving the table normally mean a new round, even when the new hands look like the old ones.
+    # The previous frame is only taken as misread once this one proves it: it carries on from the frame
+    # before, but not from the previous one (a card read differently, then changed back).
+    if not (earlier_player or earlier_dealer):
+        return False
+    return (carries_on(current_player, current_dealer, earlier_player, earlier_dealer)
+            and not carries_on(current_player, current_dealer, previous_player, previous_dealer))
+
+
+def process_frame(current_player_hand, current_dealer_hand):
+    """Update the count from one analyzed frame. Returns (player_delta, dealer_delta, action or None)."""
+    global prev_player_hand, prev_dealer_hand, round_over, last_frame
 
-    player_delta = get_card_deltas(current_player_hand, prev_player_hand)
-    dealer_delta = get_card_deltas(current_dealer_hand, prev_dealer_hand)
+    mark, earlier_player, earlier_dealer, earlier_over = last_frame
+    # After a surrender the next frame was a new round, whatever this one shows
+    if not earlier_over and is_misread(current_player_hand, current_dealer_hand, prev_player_hand,
+                                       prev_dealer_hand, earlier_player, earlier_dealer):
+        agent.restore(mark)
+        prev_player_hand, prev_dealer_hand, round_over = earlier_player, earlier_dealer, earlier_over
+        print("Previous frame was misread; rolled back its count updates")
+    last_frame = (agent.snapshot(), prev_player_hand, prev_dealer_hand, round_over)
+
+    counted_player, counted_dealer = prev_player_hand, prev_dealer_hand
+    if not carries_on(current_player_hand, current_dealer_hand, prev_player_hand, prev_dealer_hand):
+        # New round: every card on the table is new, even ranks that were also in the last hand
+        counted_player, counted_dealer = [], []
+        round_over = False
+
+    player_delta = get_card_deltas(current_player_hand, counted_player)
+    dealer_delta = get_card_deltas(current_dealer_hand, counted_dealer)
 
     if dealer_delta:
         agent.update_count(dealer_delta) 
     if player_delta:
         agent.update_count(player_delta)
 
+    action = None
     if player_delta:
-        action = agent.get_move(current_player_hand, current_dealer_hand)
-        post_comment_with_mouse(action.lower())    
-        print(f"{action}")
+        with metrics.span("get_move"):
+            action = agent.get_move(current_player_hand, current_dealer_hand)
+        round_over = action == 'SURRENDER'
 
     prev_player_hand = current_player_hand
     prev_dealer_hand = current_dealer_hand
+    return player_delta, dealer_delta, action
+
+
+def put_latest(queue, item, dropped_counter="items_dropped"):
+    """Put `item` on a bounded queue, dropping the oldest entry if it is full (stale frames are useless)."""
+    if queue.full():
+        queue.get_nowait()
+        metrics.incr(dropped_counter)
+        print("Dropped a stale item")
+    queue.put_nowait(item)
+
+
+class StageWorker:
+    """
+    Runs one stage's blocking calls on its own thread, strictly one at a time.
+    A timeout stops the wait, not the thread (Python threads cannot be killed), so the next
+    call only starts once the timed-out one has really returned: no two mouse sequences
+    interleave, and no two analyses touch the frame cache or recorder at once.
+    """
+    def __init__(self, name):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._pending = None
+
+    async def idle(self):
+        """Wait until the previous call (possibly one that timed out) has finished."""
+        if self._pending is not None and not self._pending.done():
+            await asyncio.wait([self._pending])
+
+    async def run(self, timeout, fn, *args, **kwargs):
+        await self.idle()
+        loop = asyncio.get_running_loop()
+        self._pending = loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+        # Fetch the result even when nobody is waiting any more, so a late failure is not reported as unretrieved
+        self._pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return await asyncio.wait_for(asyncio.shield(self._pending), timeout)
+
+
+capture_worker = StageWorker("capture")
+analyze_worker = StageWorker("analyze")
+action_worker = StageWorker("action")
+
+
+async def capture_stage(frames):
+    while True:
+        started = time.monotonic()
+        try:
+            image_bytes, mime = await capture_worker.run(CAPTURE_TIMEOUT, capture_frame, regions,
+                                                         max_width=MAX_WIDTH if regions else None,
+                                                         debug_path=DEBUG_FRAME)
+            put_latest(frames, (started, image_bytes, mime), "frames_dropped")
+        except Exception as e:
+            metrics.incr("capture_failures")
+            print(f"Capture failed: {e!r}")
+        await asyncio.sleep(max(0.0, CAPTURE_INTERVAL - (time.monotonic() - started)))
+
+
+async def analyze_stage(frames, actions):
+    while True:
+        captured_at, image_bytes, mime = await frames.get()
+        if session is not None:
+            # A call that timed out may have stored its reply since; it belongs to no frame we will record
+            await analyze_worker.idle()
+            cards_viewing.client.take_text()
+        try:
+            current_player_hand, current_dealer_hand = await analyze_worker.run(
+                ANALYZE_TIMEOUT, cards_viewing.analyze_image_bytes, image_bytes, mime, frame_cache, recognizer)
+        except Exception as e:
+            metrics.incr("analyze_failures")
+            print(f"Failed to analyze frame: {e!r}")
+            if session is not None:
+                session.record(image_bytes, mime, cards_viewing.client.take_text(), None, None,
+                               None, None, None, error=repr(e))
+            continue
+        metrics.observe("capture_to_read", time.monotonic() - captured_at)
+
+        player_delta, dealer_delta, action = process_frame(current_player_hand, current_dealer_hand)
+        if session is not None:
+            session.record(image_bytes, mime, cards_viewing.client.take_text(), current_player_hand,
+                           current_dealer_hand, player_delta, dealer_delta, action)
+        if action:
+            put_latest(actions, (captured_at, action), "actions_dropped")
+
+
+async def act_stage(actions):
+    while True:
+        captured_at, action = await actions.get()
+        await action_worker.idle()
+        age = time.monotonic() - captured_at
+        if age > DECISION_DEADLINE:
+            metrics.incr("actions_skipped")
+            print(f"Skipping {action}: frame is {age:.1f}s old")
+            continue
+        try:
+            with metrics.span("action"):
+                await action_worker.run(ACTION_TIMEOUT, post_comment_with_mouse, action.lower())
+            metrics.observe("capture_to_action", time.monotonic() - captured_at)
+            print(f"{action}")
+        except Exception as e:
+            metrics.incr("action_failures")
+            print(f"Failed to post {action}: {e!r}")
+
+
+async def metrics_stage():
+    while True:
+        await asyncio.sleep(METRICS_EVERY)
+        try:
+            metrics.write_json(METRICS_FILE)
+        except OSError as e:
+            print(f"Could not write metrics: {e!r}")
+
+
+async def run_pipeline():
+    # Size-1 queues: each stage always works on the newest frame / decision
+    frames = asyncio.Queue(maxsize=1)
+    actions = asyncio.Queue(maxsize=1)
+    stages = [capture_stage(frames), analyze_stage(frames, actions), act_stage(actions)]
+    if metrics.enabled:
+        stages.append(metrics_stage())
+    await asyncio.gather(*stages)
+
+
+def main():
+    global recognizer, session
+    from card_recognizer import CardRecognizer
+    recognizer = CardRecognizer.load(regions)
+    if recognizer is None:
+        print("No card templates or regions; all frames go to the model")
+    metrics.enable()
+    os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    if RECORD_DIR:
+        from replay import RecordingClient, SessionRecorder
+        cards_viewing.client = RecordingClient(cards_viewing.get_client())
+        session = SessionRecorder(RECORD_DIR)
+    asyncio.run(run_pipeline())
+
+
+if __name__ == "__main__":
+    main()
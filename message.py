@@ -1,9 +1,10 @@
-import pyautogui
 import time
 import random
 
 
 def post_comment_with_mouse(message):
+    import pyautogui
+
     # 1. Move to the coordinates of the comment box
     # Note: You'll need to find your specific X, Y coordinates
     # Use pyautogui.position() to find them
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Off by default: span() hands back one shared do-nothing object; observe() and incr() return immediately
+enabled = False
+WINDOW = 1024          # Latest samples kept per stage for the rolling percentiles
+
+_samples = {}
+_counters = {}
+_lock = threading.Lock()   # Stages run on several threads; guards counter updates and new sample deques
+_started = time.time()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    global _started
+    with _lock:
+        _samples.clear()
+        _counters.clear()
+        _started = time.time()
+
+
+def span(name):
+    """`with span("stage"):` records the block's wall time under `name` (when enabled)."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def observe(name, seconds):
+    if not enabled:
+        return
+    samples = _samples.get(name)
+    if samples is None:
+        with _lock:
+            samples = _samples.setdefault(name, deque(maxlen=WINDOW))
+    # deque.append with maxlen is atomic, so the hot path needs no lock
+    samples.append(seconds)
+
+
+def incr(name, n=1):
+    if not enabled:
+        return
+    # get-then-set is a read-modify-write; without the lock concurrent increments get lost
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def snapshot():
+    """Counters plus count/mean/p50/p95/p99/max (in ms) over each stage's rolling window."""
+    stages = {}
+    with _lock:
+        items = list(_samples.items())
+        counters = dict(_counters)
+    for name, samples in items:
+        values = sorted(samples)
+        if not values:
+            continue
+        stages[name] = {
+            'count': len(values),
+            'mean_ms': sum(values) / len(values) * 1000,
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'max_ms': values[-1] * 1000,
+        }
+    return {'uptime_s': time.time() - _started, 'stages': stages, 'counters': counters}
+
+
+def report():
+    """Human-readable table of the current snapshot."""
+    snap = snapshot()
+    lines = [f"{'stage':<18}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, s in sorted(snap['stages'].items()):
+        lines.append(f"{name:<18}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+                     f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    lines.extend(f"{name}: {value}" for name, value in sorted(snap['counters'].items()))
+    return "\n".join(lines)
+
+
+def write_json(path):
+    """Atomically replace `path` with the current snapshot."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(snapshot(), fh, indent=2)
+    os.replace(tmp, path)
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve the snapshot as JSON at http://host:port/metrics from a daemon thread. Returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            body = json.dumps(snapshot()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from blackjack import NUM_DECKS, STARTING_BANKROLL
+from blackjack_batch import simulate_batch, summarize
+
+BATCH_SIZE = 20000    # Sessions simulated at once inside a worker (bounds memory per process)
+
+
+def split_evenly(total, parts):
+    """Split `total` into `parts` integers that differ by at most one."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _run_worker(sessions, rounds, seed_seq, sim_kwargs):
+    """Simulate `sessions` sessions with a private RNG stream; returns concatenated per-session arrays."""
+    chunks = split_evenly(sessions, max(1, -(-sessions // BATCH_SIZE)))
+    parts = [
+        simulate_batch(n, rounds, seed=np.random.default_rng(child), **sim_kwargs)
+        for n, child in zip(chunks, seed_seq.spawn(len(chunks)))
+        if n
+    ]
+    if not parts:
+        return None
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def run_parallel(sessions, rounds, workers=None, seed=0, num_decks=NUM_DECKS,
+                 starting_bankroll=STARTING_BANKROLL, **sim_kwargs):
+    """
+    Split `sessions` independent sessions of up to `rounds` hands across a process pool.
+    Worker i draws from SeedSequence(seed).spawn(workers)[i], so a given (seed, workers)
+    pair reproduces the same numbers bit for bit on any machine.
+    Returns (report, per_worker_reports).
+    """
+    if sessions < 1:
+        raise ValueError(f"sessions must be at least 1, got {sessions}")
+    workers = workers or os.cpu_count() or 1
+    shares = split_evenly(sessions, workers)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    sim_kwargs = dict(sim_kwargs, num_decks=num_decks, starting_bankroll=starting_bankroll)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_worker, share, rounds, seed_seq, sim_kwargs)
+            for share, seed_seq in zip(shares, seeds)
+        ]
+        results = [f.result() for f in futures]
+
+    results = [r for r in results if r is not None]
+    merged = {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+    per_worker = [summarize(r, starting_bankroll) for r in results]
+    report = summarize(merged, starting_bankroll)
+    report['workers'] = workers
+    report['seed'] = seed
+    return report, per_worker
+
+
+def run_parallel_hands(total_hands, rounds, **kwargs):
+    """Like run_parallel, but sized by a total hand budget of `total_hands` split into sessions of `rounds`."""
+    return run_parallel(-(-total_hands // rounds), rounds, **kwargs)
+
+
+def run_until_converged(target_halfwidth=0.5, reference_ev=None, z=1.96, sessions_per_chunk=2000,
+                        rounds=100, min_hands=100000, max_hands=10 ** 9, seed=0,
+                        starting_bankroll=STARTING_BANKROLL, **sim_kwargs):
+    """
+    Simulate in chunks until EV per hand (in $) is pinned down, instead of a fixed hand count.
+    Stops once the z-level confidence half-width drops below `target_halfwidth`, or, with
+    `reference_ev`, as soon as the whole interval lies below it (provably worse).
+    Never stops before `min_hands` (guards against lucky early looks) and gives up at `max_hands`.
+    """
+    seeds = np.random.SeedSequence(seed)
+    hands = 0
+    net_sum = 0.0
+    net_sq_sum = 0.0
+    ruined = sessions = 0
+    reason = 'max_hands'
+
+    while hands < max_hands:
+        result = simulate_batch(sessions_per_chunk, rounds, seed=np.random.default_rng(seeds.spawn(1)[0]),
+                                starting_bankroll=starting_bankroll, **sim_kwargs)
+        hands += int(result['hands'].sum())
+        net_sum += result['net_sum'].sum()
+        net_sq_sum += result['net_sq_sum'].sum()
+        ruined += int(result['ruined'].sum())
+        sessions += sessions_per_chunk
+
+        ev = net_sum / hands
+        std = np.sqrt(max(net_sq_sum / hands - ev * ev, 0.0))
+        halfwidth = z * std / np.sqrt(hands)
+        if hands < min_hands:
+            continue
+        if halfwidth < target_halfwidth:
+            reason = 'converged'
+            break
+        if reference_ev is not None and ev + halfwidth < reference_ev:
+            reason = 'worse_than_reference'
+            break
+
+    return {
+        'hands': hands,
+        'sessions': sessions,
+        'ev_per_hand': float(ev),
+        'std_per_hand': float(std),
+        'ci': (float(ev - halfwidth), float(ev + halfwidth)),
+        'risk_of_ruin': ruined / sessions,
+        'stopped': reason,
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    report, per_worker = run_parallel(100000, 1000, seed=0)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {report['hands']} hands on {report['workers']} workers in {elapsed:.2f}s")
+    for i, stats in enumerate(per_worker):
+        print(f"  worker {i}: {stats['hands']} hands, EV/hand {stats['ev_per_hand']:.4f}")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,85 @@
+import numpy as np
+
+import strategy
+from blackjack_agent import ACE, UNKNOWN, HARD_BY_CODE, VALUE_BY_CODE, HI_LO_BY_CODE, card_code
+
+# --- Rank Codes ---
+# Same interned codes as BlackjackAgent, as arrays for vectorized lookups
+HARD_VALUES = np.array(HARD_BY_CODE, dtype=np.int16)
+DEALER_VALUES = np.array(VALUE_BY_CODE, dtype=np.int16)
+HI_LO = np.array(HI_LO_BY_CODE, dtype=np.int16)
+COUNTED = np.arange(UNKNOWN + 1) != UNKNOWN
+
+
+class MultiTableAgent:
+    """
+    Hi-Lo count state for `num_tables` tables held in arrays, plus a batch decision API.
+    Table ids are integers 0 .. num_tables - 1.
+    """
+    def __init__(self, num_tables, num_decks=6):
+        self.num_tables = num_tables
+        self.num_decks = num_decks
+        self.total_cards = num_decks * 52
+        self.running_count = np.zeros(num_tables, dtype=np.int32)
+        self.cards_seen = np.zeros(num_tables, dtype=np.int32)
+        self._table = strategy.as_array(strategy.rules_table(num_decks))
+
+    def reset_table(self, table_id):
+        """Start a fresh count, e.g. after the table's shoe is shuffled."""
+        self.running_count[table_id] = 0
+        self.cards_seen[table_id] = 0
+
+    def update_counts(self, entries):
+        """entries: iterable of (table_id, new_cards). Same as BlackjackAgent.update_count, per table."""
+        tables = []
+        codes = []
+        for table_id, cards in entries:
+            for card in cards:
+                tables.append(table_id)
+                codes.append(card_code(card))
+        if not codes:
+            return
+        tables = np.array(tables, dtype=np.intp)
+        codes = np.array(codes, dtype=np.intp)
+        np.add.at(self.running_count, tables, HI_LO[codes])
+        np.add.at(self.cards_seen, tables, COUNTED[codes])
+
+    def get_true_counts(self, table_ids=None):
+        table_ids = slice(None) if table_ids is None else np.asarray(table_ids)
+        decks_remaining = np.maximum((self.total_cards - self.cards_seen[table_ids]) / 52, 0.5)
+        return self.running_count[table_ids] / decks_remaining
+
+    def get_moves(self, entries):
+        """
+        entries: sequence of (player_cards, dealer_cards, table_id), cards as strings like BlackjackAgent.get_move.
+        Returns one move name per entry, all decided in a single vectorized pass.
+        """
+        owners = []
+        codes = []
+        dealer = []
+        num_cards = []
+        for i, (player_cards, dealer_cards, _) in enumerate(entries):
+            if not dealer_cards:
+                raise ValueError(f"Entry {i}: dealer must have at least one card")
+            dealer.append(card_code(dealer_cards[0]))
+            num_cards.append(len(player_cards))
+            for card in player_cards:
+                owners.append(i)
+                codes.append(card_code(card))
+        if not dealer:
+            return []
+
+        n = len(dealer)
+        dealer = np.array(dealer, dtype=np.intp)
+        if (dealer == UNKNOWN).any():
+            raise ValueError(f"Unrecognized dealer upcard in entries {np.flatnonzero(dealer == UNKNOWN).tolist()}")
+        owners = np.array(owners, dtype=np.intp)
+        codes = np.array(codes, dtype=np.intp)
+        hard = np.bincount(owners, weights=HARD_VALUES[codes], minlength=n).astype(np.intp)
+        aces = np.bincount(owners, weights=codes == ACE, minlength=n)
+
+        soft = (aces > 0) & (hard + 10 <= 21)
+        value = np.minimum(np.where(soft, hard + 10, hard), strategy.MAX_TOTAL)
+        two_cards = (np.array(num_cards) == 2).astype(np.intp)
+        moves = self._table[soft.astype(np.intp), value, DEALER_VALUES[dealer], two_cards, two_cards]
+        return [strategy.MOVES[m] for m in moves.tolist()]
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+
+TRACE_SIZE = 4096          # Points kept for plotting, regardless of run length
+SPILL_CHUNK = 1 << 16      # Bankrolls buffered before each write to the spill file
+
+
+class BankrollRecorder:
+    """
+    Streaming replacement for a list of bankrolls.
+
+    Keeps online statistics of the per-hand result (Welford), peak, minimum and maximum
+    drawdown, plus a trace of at most `trace_size` points: every `stride`-th bankroll, with
+    the stride doubling (and the trace halving) whenever it fills up. Memory stays constant
+    however many hands are played. With `spill_path`, every bankroll is also appended to a
+    raw float64 file that load_trace maps back without reading it into memory.
+    """
+    def __init__(self, bankroll, trace_size=TRACE_SIZE, spill_path=None):
+        self.start = bankroll
+        self.last = bankroll
+        self.hands = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.peak = bankroll
+        self.min_bankroll = bankroll
+        self.max_drawdown = 0.0
+
+        self.trace_size = trace_size
+        self.stride = 1
+        self.trace = [bankroll]
+        self.trace_hands = [0]
+
+        self.spill_path = spill_path
+        self._spill = None
+        if spill_path:
+            self._spill = open(spill_path, 'wb')
+            self._buffer = np.empty(SPILL_CHUNK)
+            self._buffered = 0
+            self._write(bankroll)
+
+    def append(self, bankroll):
+        """Record the bankroll after one more hand."""
+        self.hands += 1
+        net = bankroll - self.last
+        self.last = bankroll
+        delta = net - self.mean
+        self.mean += delta / self.hands
+        self._m2 += delta * (net - self.mean)
+
+        if bankroll > self.peak:
+            self.peak = bankroll
+        elif self.peak - bankroll > self.max_drawdown:
+            self.max_drawdown = self.peak - bankroll
+        if bankroll < self.min_bankroll:
+            self.min_bankroll = bankroll
+
+        if self.hands % self.stride == 0:
+            self.trace.append(bankroll)
+            self.trace_hands.append(self.hands)
+            if len(self.trace) >= self.trace_size:
+                self.trace = self.trace[::2]
+                self.trace_hands = self.trace_hands[::2]
+                self.stride *= 2
+
+        if self._spill:
+            self._write(bankroll)
+
+    def _write(self, bankroll):
+        self._buffer[self._buffered] = bankroll
+        self._buffered += 1
+        if self._buffered == SPILL_CHUNK:
+            self.flush()
+
+    def flush(self):
+        if self._spill and self._buffered:
+            self._spill.write(self._buffer[:self._buffered].tobytes())
+            self._buffered = 0
+            self._spill.flush()
+
+    def close(self):
+        if self._spill:
+            self.flush()
+            self._spill.close()
+            self._spill = None
+
+    @property
+    def variance(self):
+        return self._m2 / (self.hands - 1) if self.hands > 1 else 0.0
+
+    def stats(self):
+        return {
+            'hands': self.hands,
+            'bankroll': self.last,
+            'ev_per_hand': self.mean,
+            'std_per_hand': math.sqrt(self.variance),
+            'min_bankroll': self.min_bankroll,
+            'max_drawdown': self.max_drawdown,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{s['hands']} hands | bankroll ${s['bankroll']:.2f} | EV/hand {s['ev_per_hand']:.3f} "
+                f"| std {s['std_per_hand']:.2f} | min ${s['min_bankroll']:.2f} | max drawdown ${s['max_drawdown']:.2f}")
+
+
+def load_trace(path):
+    """Memory-map a spill file written by BankrollRecorder (one float64 per hand, plus the start)."""
+    return np.memmap(path, dtype=np.float64, mode='r')
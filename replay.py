@@ -0,0 +1,208 @@
+"""
+Record live sessions and replay them offline.
+
+Recording (set main_loop.RECORD_DIR) writes a session directory:
+  frames.bin   every captured frame's encoded bytes, back to back
+  log.jsonl    one line per analyzed frame: offset/size/mime of its bytes, the raw model
+               reply (null when the cache or local recognizer answered, or the call failed
+               without one), the hands read, the deltas counted and the action taken; frames
+               that could not be analyzed have null hands and the exception under "error"
+
+Replay feeds the frames back through cards_viewing.analyze_image_bytes (with a stand-in
+client that returns the recorded replies), main_loop.process_frame (get_card_deltas and
+BlackjackAgent) and a no-op action sink, as fast as the CPU allows:
+
+  python replay.py <session_dir> [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+LOG_FILE = "log.jsonl"
+FRAMES_FILE = "frames.bin"
+
+
+class _Response:
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class RecordingClient:
+    """Wraps the real model client and keeps the text of the latest reply for the session log."""
+    def __init__(self, inner):
+        self.inner = inner
+        self.models = self
+        self.last_text = None
+
+    def generate_content(self, **kwargs):
+        response = self.inner.models.generate_content(**kwargs)
+        self.last_text = response.text
+        return response
+
+    def take_text(self):
+        text, self.last_text = self.last_text, None
+        return text
+
+
+class ReplayClient:
+    """Stand-in for the Gemini client: answers each request with the reply queued by `queue`."""
+    def __init__(self):
+        self.models = self
+        self.calls = 0
+        self._pending = None
+
+    def queue(self, text):
+        self._pending = text
+
+    def generate_content(self, **kwargs):
+        if self._pending is None:
+            raise RuntimeError("ReplayClient called with no recorded reply queued")
+        self.calls += 1
+        text, self._pending = self._pending, None
+        return _Response(text)
+
+
+class SessionRecorder:
+    """Appends frames and their outcomes to a session directory (created if needed)."""
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._frames = open(os.path.join(path, FRAMES_FILE), "ab")
+        self._log = open(os.path.join(path, LOG_FILE), "a")
+        self._start = time.monotonic()
+
+    def record(self, image_bytes, mime, response, player, dealer, player_delta, dealer_delta, action, error=None):
+        offset = self._frames.tell()
+        self._frames.write(image_bytes)
+        self._frames.flush()
+        entry = {
+            "t": round(time.monotonic() - self._start, 3),
+            "offset": offset, "size": len(image_bytes), "mime": mime,
+            "response": response,
+            "player": player, "dealer": dealer,
+            "player_delta": player_delta, "dealer_delta": dealer_delta,
+            "action": action,
+            "error": error,
+        }
+        self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._log.flush()
+
+    def close(self):
+        self._frames.close()
+        self._log.close()
+
+
+def load_session(path):
+    """Return the session's log entries, each with its frame bytes under 'frame'."""
+    with open(os.path.join(path, FRAMES_FILE), "rb") as fh:
+        frames = fh.read()
+    entries = []
+    with open(os.path.join(path, LOG_FILE), "r") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            entry["frame"] = frames[entry["offset"]:entry["offset"] + entry["size"]]
+            entries.append(entry)
+    return entries
+
+
+def synthetic_reply(player, dealer):
+    """A model-style reply for frames the cache or local recognizer answered during recording."""
+    return json.dumps({"player": {"count": len(player), "cards": player},
+                       "dealer": {"count": len(dealer), "cards": dealer}})
+
+
+def replay(entries, num_decks=1, cache=None, recognizer=None, quiet=True, repeat=1):
+    """
+    Run recorded frames through the live decision path, `repeat` times from a fresh count.
+    Actions go to a no-op sink (collected, never typed). Returns a report with throughput
+    and every frame whose hands or action differ from the recording; a frame that failed
+    while recording must fail again, and one that succeeded must not.
+    """
+    import cards_viewing
+    import main_loop
+
+    client = ReplayClient()
+    saved_client = cards_viewing.client
+    cards_viewing.client = client
+    mismatches = []
+    actions = []
+    failures = 0
+    out = io.StringIO() if quiet else sys.stdout
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out):
+            for i, entry in enumerate(entries * repeat):
+                if i % len(entries) == 0:
+                    main_loop.reset_state(num_decks)
+                reply = entry["response"]
+                recorded_error = entry.get("error")
+                if reply is None and recorded_error is None:
+                    reply = synthetic_reply(entry["player"], entry["dealer"])
+                # A failed call with no reply queues nothing, so a model call fails again here
+                client.queue(reply)
+                try:
+                    player, dealer = cards_viewing.analyze_image_bytes(entry["frame"], entry["mime"], cache, recognizer)
+                except (ValueError, RuntimeError) as e:
+                    # The live loop skips frames it cannot analyze; so does the replay
+                    failures += 1
+                    if recorded_error is None:
+                        mismatches.append({"frame": i % len(entries), "recorded": [entry["player"], entry["dealer"], entry["action"]],
+                                           "replayed": repr(e)})
+                    continue
+                if recorded_error is not None:
+                    mismatches.append({"frame": i % len(entries), "recorded": recorded_error,
+                                       "replayed": [player, dealer, None]})
+                    continue
+                player_delta, dealer_delta, action = main_loop.process_frame(player, dealer)
+                if action:
+                    actions.append(action)
+                if (player, dealer, action) != (entry["player"], entry["dealer"], entry["action"]):
+                    mismatches.append({"frame": i % len(entries), "recorded": [entry["player"], entry["dealer"], entry["action"]],
+                                       "replayed": [player, dealer, action]})
+                if quiet:
+                    out.seek(0)
+                    out.truncate()
+    finally:
+        cards_viewing.client = saved_client
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": len(entries) * repeat,
+        "seconds": elapsed,
+        "frames_per_s": len(entries) * repeat / elapsed if elapsed else float("inf"),
+        "model_calls": client.calls,
+        "parse_failures": failures,
+        "actions": len(actions),
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("session", help="session directory written by a recording run")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the session this many times back to back")
+    parser.add_argument("--decks", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show the live loop's prints")
+    args = parser.parse_args(argv)
+
+    report = replay(load_session(args.session), args.decks, quiet=not args.verbose, repeat=args.repeat)
+    print(f"Replayed {report['frames']} frames in {report['seconds']:.3f}s "
+          f"({report['frames_per_s']:,.0f} frames/s), {report['actions']} actions, "
+          f"{report['parse_failures']} parse failures")
+    for mismatch in report["mismatches"][:20]:
+        print(f"  frame {mismatch['frame']}: recorded {mismatch['recorded']}, replayed {mismatch['replayed']}")
+    if report["mismatches"]:
+        print(f"{len(report['mismatches'])} frames differ from the recording")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,13 @@
-import pyautogui
 import os
 import time
 import re
 
-def capture_and_save_to_out(filename):
+import card_regions
+import metrics
+
+def capture_and_save_to_out(filename, regions=None, max_width=card_regions.MAX_WIDTH, quality=card_regions.JPEG_QUALITY):
+    """Screenshot to img/<filename>. With `regions` (see card_regions), only the card areas are kept,
+    downscaled to `max_width` (None keeps full resolution) and encoded at `quality`."""
     # 1. Define the 'img' directory relative to the script
     base_dir = "img"
     full_path = os.path.join(base_dir, filename)
@@ -13,9 +17,18 @@ def capture_and_save_to_out(filename):
         os.makedirs(base_dir)
         print(f"Created directory: {base_dir}")
 
-    # 4. Take the screenshot
+    # 4. Take the screenshot (pyautogui needs a display, so load it only when capturing)
+    import pyautogui
     screenshot = pyautogui.screenshot()
 
+    if regions:
+        fmt = "PNG" if filename.lower().endswith(".png") else "JPEG"
+        data, _ = card_regions.encode_frame(screenshot, regions, max_width, fmt, quality)
+        with open(full_path, "wb") as fh:
+            fh.write(data)
+        print(f"Success! Saved {len(data)} bytes to: {full_path}")
+        return full_path
+
     # If saving as JPEG, convert from RGBA to RGB because JPEG doesn't support alpha
     ext = os.path.splitext(filename)[1].lower()
     if ext in (".jpg", ".jpeg"):
@@ -27,6 +40,22 @@ def capture_and_save_to_out(filename):
     
     return full_path
 
+def capture_frame(regions=None, max_width=card_regions.MAX_WIDTH, fmt="JPEG", quality=card_regions.JPEG_QUALITY,
+                  debug_path=None):
+    """Screenshot straight to encoded bytes in memory, ready for analyze_image_bytes. Returns (bytes, mime).
+    max_width=None uploads at full resolution.
+    Nothing touches the disk unless `debug_path` is given, in which case the same bytes are also written there."""
+    import pyautogui
+
+    with metrics.span("capture"):
+        screenshot = pyautogui.screenshot()
+    with metrics.span("encode"):
+        data, mime = card_regions.encode_frame(screenshot, regions, max_width, fmt, quality)
+    if debug_path:
+        with open(debug_path, "wb") as fh:
+            fh.write(data)
+    return data, mime
+
 def get_next_filename(base_dir="img", prefix="screenshot", ext=".jpeg", pad=3):
     """Return next numbered filename like screenshot_001.jpeg"""
     if not os.path.exists(base_dir):
@@ -0,0 +1,151 @@
+import itertools
+import os
+
+# --- Moves ---
+HIT, STAND, DOUBLE, SURRENDER = 0, 1, 2, 3
+MOVES = ['HIT', 'STAND', 'DOUBLE', 'SURRENDER']
+
+# --- Table Layout ---
+# as_array()[soft][total][dealer value][can double][can surrender] -> move code
+# Totals above 21 are clamped to 21; dealer values run 2-11 (Ace = 11).
+MAX_TOTAL = 21
+TABLE_SHAPE = (2, MAX_TOTAL + 1, 12, 2, 2)
+
+# --- Rule-specific tables ---
+# Generated by `python strategy_gen.py` and cached on disk, one small file per rule set
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategy_cache")
+CACHE_MAGIC = b"BJS1"
+
+
+def basic_strategy(player_val, is_soft, dealer_val, can_double, can_surrender):
+    """The basic strategy chart, written out once. Only used to fill the table."""
+    # Surrender
+    if can_surrender:
+        if player_val == 16 and dealer_val in [9, 10, 11]: return SURRENDER
+        if player_val == 15 and dealer_val == 10: return SURRENDER
+
+    # Soft Totals
+    if is_soft:
+        if player_val >= 20: return STAND
+        if player_val == 19: return DOUBLE if dealer_val == 6 and can_double else STAND
+        if player_val == 18:
+            if dealer_val in [2,3,4,5,6]: return DOUBLE if can_double else STAND
+            if dealer_val in [9,10,11]: return HIT
+            return STAND
+        if player_val == 17: return DOUBLE if dealer_val in [3,4,5,6] and can_double else HIT
+        if player_val in [15,16]: return DOUBLE if dealer_val in [4,5,6] and can_double else HIT
+        if player_val in [13,14]: return DOUBLE if dealer_val in [5,6] and can_double else HIT
+        return HIT
+
+    # Hard Totals
+    if player_val >= 17: return STAND
+    if player_val in [13,14,15,16]: return STAND if dealer_val in [2,3,4,5,6] else HIT
+    if player_val == 12: return STAND if dealer_val in [4,5,6] else HIT
+    if player_val == 11: return DOUBLE if can_double else HIT
+    if player_val == 10: return DOUBLE if dealer_val < 10 and can_double else HIT
+    if player_val == 9: return DOUBLE if dealer_val in [3,4,5,6] and can_double else HIT
+    return HIT
+
+
+def build_table(chart=basic_strategy):
+    """Flat bytes of move codes in TABLE_SHAPE order (C order, last axis fastest)."""
+    return bytes(
+        chart(total, bool(soft), dealer_val, bool(can_double), bool(can_surrender))
+        for soft, total, dealer_val, can_double, can_surrender in itertools.product(*map(range, TABLE_SHAPE))
+    )
+
+
+# Plain bytes so importing the agent does not pull in NumPy
+TABLE = build_table()
+# Same table as move names, for cheap scalar lookups
+_FLAT_MOVES = [MOVES[code] for code in TABLE]
+
+
+def as_array(table=TABLE):
+    """The table as an int8 NumPy array of TABLE_SHAPE, for vectorized lookups."""
+    import numpy as np
+    return np.frombuffer(table, dtype=np.int8).reshape(TABLE_SHAPE)
+
+
+def flat_index(player_val, is_soft, dealer_val, can_double, can_surrender):
+    """Offset of one decision in the flat table (player_val must already be <= MAX_TOTAL)."""
+    return (((is_soft * (MAX_TOTAL + 1) + player_val) * 12 + dealer_val) * 2 + can_double) * 2 + can_surrender
+
+
+def move_names(table):
+    """A table as move names, in the form lookup() takes."""
+    return [MOVES[code] for code in table]
+
+
+def lookup(player_val, is_soft, dealer_val, can_double, can_surrender, moves=_FLAT_MOVES):
+    """Return the move name ('HIT', 'STAND', ...) for one decision, from `moves` (see move_names)."""
+    if player_val > MAX_TOTAL:
+        player_val = MAX_TOTAL
+    index = (((is_soft * (MAX_TOTAL + 1) + player_val) * 12 + dealer_val) * 2 + can_double) * 2 + can_surrender
+    return moves[index]
+
+
+def cache_path(num_decks, hit_soft_17=False, surrender=True, cache_dir=CACHE_DIR):
+    rules = f"{num_decks}d_{'h17' if hit_soft_17 else 's17'}_{'ls' if surrender else 'ns'}"
+    return os.path.join(cache_dir, rules + ".bin")
+
+
+def save_table(table, num_decks, hit_soft_17=False, surrender=True, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(num_decks, hit_soft_17, surrender, cache_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(CACHE_MAGIC + table)
+    os.replace(tmp, path)
+    return path
+
+
+def load_table(num_decks, hit_soft_17=False, surrender=True, cache_dir=CACHE_DIR):
+    """The cached table for these rules, or None if it is missing or malformed."""
+    try:
+        with open(cache_path(num_decks, hit_soft_17, surrender, cache_dir), "rb") as fh:
+            data = fh.read()
+    except OSError:
+        return None
+    if data[:len(CACHE_MAGIC)] != CACHE_MAGIC or len(data) != len(CACHE_MAGIC) + len(TABLE):
+        return None
+    return data[len(CACHE_MAGIC):]
+
+
+_rules_tables = {}
+_chart_tables = {}
+
+
+def chart_table(hit_soft_17=False, surrender=True):
+    """The built-in chart with the rules applied: without surrender it never answers SURRENDER.
+    The chart is for a dealer standing on soft 17; H17 games get it too, with a warning."""
+    key = (hit_soft_17, surrender)
+    table = _chart_tables.get(key)
+    if table is None:
+        if hit_soft_17:
+            print("No generated strategy for H17; using the S17 chart "
+                  "(run `python strategy_gen.py <num_decks> --h17` for the exact one)")
+        if surrender:
+            table = TABLE
+        else:
+            table = build_table(lambda total, soft, dealer_val, can_double, can_surrender:
+                                basic_strategy(total, soft, dealer_val, can_double, False))
+        _chart_tables[key] = table
+    return table
+
+
+def rules_table(num_decks, hit_soft_17=False, surrender=True, cache_dir=CACHE_DIR):
+    """
+    The strategy table for a rule set: from this process's memo, else the disk cache written by
+    `python strategy_gen.py`, else the built-in chart for these rules (chart_table). Never
+    generates or writes anything, so constructing a player or agent stays cheap and free of side
+    effects. Only cached tables are memoized, so one generated later is picked up.
+    """
+    key = (num_decks, hit_soft_17, surrender, cache_dir)
+    table = _rules_tables.get(key)
+    if table is None:
+        table = load_table(num_decks, hit_soft_17, surrender, cache_dir)
+        if table is None:
+            return chart_table(hit_soft_17, surrender)
+        _rules_tables[key] = table
+    return table
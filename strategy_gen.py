@@ -0,0 +1,132 @@
+"""
+Generate the total-dependent basic strategy for a rule set with the EV engine.
+
+Every cell of strategy.TABLE_SHAPE takes the move with the best EV averaged over all the hands
+with that total, each weighted by its probability of being drawn from a full shoe less the
+upcard. The EV of each hand is the engine's exact composition-dependent one with its cards
+removed. Two-card hands decide the cells where doubling or surrender is allowed; hands of
+three to MAX_CARDS cards decide the rest, which is where multi-card hands are played. Cells no
+real hand reaches (hard 0-3, soft below 12, dealer values 0-1) keep the built-in chart's move. The CLI splits the work across processes
+by (upcard, soft/hard) and writes the table to strategy.CACHE_DIR, where strategy.rules_table
+picks it up; without a cached table the players use the built-in chart.
+
+  python strategy_gen.py <num_decks> [--h17] [--no-surrender]
+"""
+import argparse
+import itertools
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+
+import strategy
+from ev_engine import EVEngine, full_shoe, value_index
+
+
+# Largest hand weighted into the no-double cells; raising it from 3 to 5 changed no cell for 1, 2 or 6 decks
+MAX_CARDS = 5
+
+
+def hands_by_total(num_cards):
+    """{(total, soft): [hand, ...]} for every num_cards-card hand (card values, Ace = 11) of 21 or less."""
+    hands = {}
+    for cards in itertools.combinations_with_replacement(range(2, 12), num_cards):
+        hard = sum(1 if value == 11 else value for value in cards)
+        soft = int(11 in cards and hard + 10 <= 21)
+        total = hard + 10 if soft else hard
+        if total <= strategy.MAX_TOTAL:
+            hands.setdefault((total, soft), []).append(cards)
+    return hands
+
+
+def draw_probability(cards, counts):
+    """Probability that the next len(cards) cards drawn from `counts` are exactly these, in any order."""
+    ways = 1
+    for value, n in Counter(cards).items():
+        ways *= comb(counts[value_index(value)], n)
+    return ways / comb(sum(counts), len(cards))
+
+
+def _weighted_evs(engine, hands, dealer_val, counts, can_double):
+    """{move: EV} averaged over `hands` by draw probability, or None if none can be drawn."""
+    sums = Counter()
+    weight = 0.0
+    for cards in hands:
+        p = draw_probability(cards, counts)
+        if not p:
+            continue
+        remaining = list(counts)
+        for value in cards:
+            remaining[value_index(value)] -= 1
+        hard = sum(1 if value == 11 else value for value in cards)
+        for move, ev in engine.evaluate(hard, 11 in cards, dealer_val, can_double, True, remaining).items():
+            sums[move] += p * ev
+        weight += p
+    return {move: ev / weight for move, ev in sums.items()} if weight else None
+
+
+def _decide_rows(num_decks, hit_soft_17, surrender, dealer_val, soft):
+    """Moves for every (total, can_double, can_surrender) cell of one upcard and hand type."""
+    engine = EVEngine(num_decks, hit_soft_17=hit_soft_17, surrender=surrender)
+    counts = full_shoe(num_decks)
+    counts[value_index(dealer_val)] -= 1
+    two_card = hands_by_total(2)
+    multi_card = {}
+    for num_cards in range(3, MAX_CARDS + 1):
+        for key, hands in hands_by_total(num_cards).items():
+            multi_card.setdefault(key, []).extend(hands)
+
+    cells = {}
+    for total in range(strategy.MAX_TOTAL + 1):
+        first_evs = _weighted_evs(engine, two_card.get((total, soft), []), dealer_val, counts, True)
+        later_evs = _weighted_evs(engine, multi_card.get((total, soft), []), dealer_val, counts, False)
+        for can_double, can_surrender in itertools.product((0, 1), repeat=2):
+            # Only two-card hands may double or surrender; a total no longer hand reaches (hard 4,
+            # soft 12) uses its two-card EVs everywhere
+            evs = first_evs if can_double or can_surrender or later_evs is None else later_evs
+            if evs is None:
+                continue
+            legal = {move: ev for move, ev in evs.items()
+                     if (move != 'DOUBLE' or can_double) and (move != 'SURRENDER' or can_surrender)}
+            cells[total, can_double, can_surrender] = strategy.MOVES.index(max(legal, key=legal.get))
+    return dealer_val, soft, cells
+
+
+def generate(num_decks, hit_soft_17=False, surrender=True, workers=None):
+    """The strategy table for these rules, as bytes in strategy.TABLE layout.
+    workers=1 runs in this process; otherwise a process pool is used (CLI only: it needs
+    the __main__ guard under the spawn start method)."""
+    # Cells no hand reaches keep the chart; only the S17 one exists, and it is only a filler here
+    table = bytearray(strategy.chart_table(False, surrender))
+    jobs = [(num_decks, hit_soft_17, surrender, dealer_val, soft)
+            for dealer_val in range(2, 12) for soft in (0, 1)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = itertools.starmap(_decide_rows, jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_decide_rows, *zip(*jobs)))
+    for dealer_val, soft, cells in results:
+        for (total, can_double, can_surrender), move in cells.items():
+            table[strategy.flat_index(total, soft, dealer_val, can_double, can_surrender)] = move
+    return bytes(table)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('num_decks', type=int)
+    parser.add_argument('--h17', action='store_true', help='dealer hits soft 17')
+    parser.add_argument('--no-surrender', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = generate(args.num_decks, args.h17, not args.no_surrender, args.workers)
+    changed = sum(a != b for a, b in zip(table, strategy.TABLE))
+    print(f"Generated in {time.perf_counter() - start:.2f}s; {changed} cells differ from the built-in chart")
+    try:
+        print(f"Saved {strategy.save_table(table, args.num_decks, args.h17, not args.no_surrender)}")
+    except OSError as e:
+        # The table is only a cache; the players fall back to the built-in chart without it
+        print(f"Could not save the table: {e!r}")
@@ -0,0 +1,91 @@
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from blackjack import (
+    NUM_DECKS, MIN_BET, MAX_BET, STARTING_BANKROLL, DECK_PENETRATION, KELLY_FRACTION, BJ_VARIANCE
+)
+from blackjack_batch import simulate_batch, summarize
+
+# Every knob a sweep can vary, with the values blackjack.py uses today
+DEFAULTS = {
+    'num_decks': NUM_DECKS,
+    'penetration': DECK_PENETRATION,
+    'min_bet': MIN_BET,
+    'max_bet': MAX_BET,
+    'kelly': KELLY_FRACTION,
+    'variance': BJ_VARIANCE,
+}
+COLUMNS = ['ev_per_hand', 'std_per_hand', 'risk_of_ruin', 'ev_diff', 'diff_se']
+
+
+def expand_grid(grid):
+    """{'num_decks': [1, 2], 'kelly': [0.5, 1.0]} -> list of full configs (defaults filled in)."""
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    keys = list(grid)
+    return [dict(DEFAULTS, **dict(zip(keys, values))) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def _run_config(config, sessions, rounds, shuffle_seed, starting_bankroll):
+    result = simulate_batch(sessions, rounds, starting_bankroll=starting_bankroll,
+                            shuffle_seed=shuffle_seed, **config)
+    return summarize(result, starting_bankroll), result['net_sum'] / np.maximum(result['hands'], 1)
+
+
+def run_sweep(grid, sessions=2000, rounds=1000, shuffle_seed=0, workers=None,
+              starting_bankroll=STARTING_BANKROLL):
+    """
+    Evaluate every configuration in `grid` in parallel on the same shoes.
+    Session i of every configuration draws the same keyed shuffles, so the paired
+    difference to the first configuration (ev_diff, with its standard error diff_se)
+    converges much faster than comparing two independent runs.
+    """
+    configs = expand_grid(grid)
+    workers = workers or min(len(configs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_config, config, sessions, rounds, shuffle_seed, starting_bankroll)
+            for config in configs
+        ]
+        results = [f.result() for f in futures]
+
+    baseline = results[0][1]
+    rows = []
+    for config, (stats, per_session) in zip(configs, results):
+        diff = per_session - baseline
+        rows.append(dict(config, **stats,
+                         ev_diff=float(diff.mean()),
+                         diff_se=float(diff.std(ddof=1) / np.sqrt(diff.size)) if diff.size > 1 else 0.0))
+    return rows
+
+
+def format_table(rows, params=None):
+    """Fixed-width text table with the swept parameters followed by the result columns."""
+    params = params or [k for k in DEFAULTS if len({row[k] for row in rows}) > 1] or list(DEFAULTS)
+    header = params + COLUMNS
+    lines = [' '.join(f'{h:>13}' for h in header)]
+    for row in rows:
+        lines.append(' '.join(
+            f'{row[h]:>13.4f}' if isinstance(row[h], float) else f'{row[h]:>13}' for h in header
+        ))
+    return '\n'.join(lines)
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as fh:
+        writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    rows = run_sweep({
+        'penetration': [0.65, 0.75, 0.85],
+        'kelly': [0.5, 0.75, 1.0],
+    }, sessions=2000, rounds=1000)
+    print(format_table(rows))
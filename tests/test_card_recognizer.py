@@ -0,0 +1,81 @@
+import json
+import random
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from card_recognizer import RANKS, CardRecognizer, evaluate, train_folder
+from card_regions import encode_frame
+
+REGIONS = {'dealer': (200, 100, 1400, 500), 'player': (200, 900, 1400, 1300)}
+
+
+def font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def render(player, dealer, rnd):
+    """An encoded frame of white cards with the rank and a pip in the top-left corner, like the table."""
+    image = Image.new('RGB', (1600, 1400), (20, 100 + rnd.randint(-10, 10), 40))
+    draw = ImageDraw.Draw(image)
+    for cards, (left, top, _, _) in ((dealer, REGIONS['dealer']), (player, REGIONS['player'])):
+        x = left + 30 + rnd.randint(0, 20)
+        for card in cards:
+            y = top + 40 + rnd.randint(0, 10)
+            color = (200, 0, 0) if rnd.random() < 0.5 else (0, 0, 0)
+            draw.rectangle((x, y, x + 180, y + 260), fill=(245, 245, 245))
+            draw.text((x + 8, y + 6), card, fill=color, font=font(40))
+            draw.ellipse((x + 12, y + 58, x + 36, y + 82), fill=color)
+            x += 220 + rnd.randint(0, 20)
+    return encode_frame(image, REGIONS)[0]
+
+
+def write_fixtures(folder, hands, seed):
+    rnd = random.Random(seed)
+    folder.mkdir()
+    labels = {}
+    for i, (player, dealer) in enumerate(hands):
+        name = f"frame_{i:03d}.jpeg"
+        (folder / name).write_bytes(render(player, dealer, rnd))
+        labels[name] = {"player": player, "dealer": dealer}
+    (folder / "labels.json").write_text(json.dumps(labels))
+    return folder
+
+
+def random_hands(rnd, count, ranks=RANKS):
+    return [([rnd.choice(ranks) for _ in range(rnd.randint(2, 4))], [rnd.choice(ranks) for _ in range(rnd.randint(1, 3))])
+            for _ in range(count)]
+
+
+@pytest.fixture(scope="module")
+def trained(tmp_path_factory):
+    rnd = random.Random(0)
+    # Every rank at least twice, then random tables
+    hands = [([rank, rank], [rank]) for rank in RANKS] + random_hands(rnd, 12)
+    recognizer = CardRecognizer(REGIONS)
+    assert train_folder(recognizer, write_fixtures(tmp_path_factory.mktemp("fx") / "train", hands, 1)) == []
+    return recognizer
+
+
+def test_reads_labeled_fixtures(trained, tmp_path):
+    folder = write_fixtures(tmp_path / "test", random_hands(random.Random(5), 15), 2)
+    report = evaluate(trained, str(folder))
+    assert report["frames"] == 15
+    assert report["correct"] == 15, report["errors"]
+    assert report["accepted"] == 15
+    assert report["accepted_wrong"] == 0
+
+
+def test_empty_table_has_zero_confidence(trained):
+    assert trained.recognize(render([], [], random.Random(3))) == ([], [], 0.0)
+
+
+def test_untrained_rank_gives_zero_confidence(tmp_path):
+    ranks = [rank for rank in RANKS if rank != 'K']
+    hands = [([rank, rank], [rank]) for rank in ranks]
+    recognizer = CardRecognizer(REGIONS)
+    assert train_folder(recognizer, write_fixtures(tmp_path / "train", hands, 1)) == []
+    assert recognizer.recognize(render(['10', '7'], ['5'], random.Random(4))) == ([], [], 0.0)
@@ -0,0 +1,80 @@
+import json
+import random
+
+import pytest
+
+from cards_viewing import extract_json, parse_response, parse_batch_response
+
+CLEAN = '{"player": {"count": 2, "cards": ["A", "10"]}, "dealer": {"count": 1, "cards": ["K"]}}'
+
+
+@pytest.mark.parametrize("text", [
+    CLEAN,
+    "```json\n" + CLEAN + "\n```",
+    "Here are the cards I can see:\n```json\n" + CLEAN + "\n```\nLet me know if you need anything else.",
+    "Sure} \"quoted\" prose { with stray braces: " + CLEAN + " {trailing} {also",
+    "{not json} {player: A 10} " + CLEAN,
+    "Sure! " + CLEAN + " " + "{ note: this is not json } " * 400,
+])
+def test_parse_response_finds_the_object(text):
+    assert parse_response(text) == (['A', '10'], ['K'])
+
+
+def test_parse_response_normalizes_ranks():
+    text = '{"note": "a } \\" {", "player": {"count": 2, "cards": ["as", "T"]}, "dealer": {"count": 1, "cards": [" kh"]}}'
+    assert parse_response(text) == (['A', '10'], ['K'])
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "no json here",
+    CLEAN[:-1],
+    CLEAN[:len(CLEAN) // 2],
+    "```json\n" + CLEAN[:-20] + "\n```",
+    "[1, 2, 3]",
+    '{"a":' * 100000,
+    '{"a":' * 100000 + '1' + '}' * 100000,
+    '{"player": {"count": 3, "cards": ["A"]}, "dealer": {"count": 0, "cards": []}}',
+    '{"player": {"count": 1, "cards": ["Z"]}, "dealer": {"count": 0, "cards": []}}',
+    '{"player": {"count": 1, "cards": "A"}, "dealer": {"count": 0, "cards": []}}',
+    '{"player": {}}',
+])
+def test_parse_response_rejects_bad_replies(text):
+    with pytest.raises(ValueError):
+        parse_response(text)
+
+
+def test_fuzzed_replies_parse_or_raise_value_error():
+    rng = random.Random(0)
+    alphabet = '{}[]":,\\ ax1\n`'
+    for _ in range(5000):
+        chars = list(CLEAN)
+        for _ in range(rng.randint(0, 5)):
+            op = rng.random()
+            pos = rng.randrange(len(chars) + 1)
+            if op < 0.4:
+                chars.insert(pos, rng.choice(alphabet))
+            elif op < 0.8 and chars:
+                del chars[min(pos, len(chars) - 1)]
+            else:
+                chars = chars[:pos]
+        text = ''.join(chars)
+        try:
+            assert isinstance(extract_json(text), dict)
+        except ValueError:
+            pass
+        try:
+            player, dealer = parse_response(text)
+            assert isinstance(player, list) and isinstance(dealer, list)
+        except ValueError:
+            pass
+
+
+def test_batch_reply_fails_only_the_bad_entry():
+    good = json.loads(CLEAN)
+    bad = {"player": {"count": 2, "cards": ["A"]}, "dealer": {"count": 0, "cards": []}}
+    results = parse_batch_response("```json\n" + json.dumps({"images": [good, bad, good]}) + "\n```", 3)
+    assert results[0] == results[2] == (['A', '10'], ['K'])
+    assert isinstance(results[1], ValueError)
+    with pytest.raises(ValueError):
+        parse_batch_response(json.dumps({"images": [good]}), 2)
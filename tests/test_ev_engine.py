@@ -0,0 +1,69 @@
+from ev_engine import ACE, TEN, EVEngine, full_shoe, value_index
+
+VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11]   # Composition index -> card value (Ace = 11)
+
+
+def total_of(cards):
+    total, aces = sum(cards), cards.count(11)
+    while total > 21 and aces:
+        total, aces = total - 10, aces - 1
+    return total, aces > 0
+
+
+def dealer_outcomes(cards, counts):
+    """{final total or 'BUST': probability} for a dealer standing on all 17s, by plain enumeration."""
+    total, _ = total_of(cards)
+    if total > 21:
+        return {'BUST': 1.0}
+    if total >= 17:
+        return {total: 1.0}
+    outcomes = {}
+    remaining = sum(counts)
+    for i, n in enumerate(counts):
+        if not n:
+            continue
+        counts[i] -= 1
+        for result, p in dealer_outcomes(cards + [VALUES[i]], counts).items():
+            outcomes[result] = outcomes.get(result, 0.0) + n / remaining * p
+        counts[i] += 1
+    return outcomes
+
+
+def test_double_against_an_ace_is_conditioned_on_the_hole_card():
+    # 1 deck, 6-5 doubling against an Ace the dealer has peeked under (no ten in the hole)
+    counts = full_shoe(1)
+    for value in (6, 5, 11):
+        counts[value_index(value)] -= 1
+    expected = 0.0
+    holes = sum(counts) - counts[TEN]
+    for hole, n_hole in enumerate(counts):
+        if not n_hole or hole == TEN:
+            continue
+        counts[hole] -= 1
+        deck = sum(counts)
+        for card, n_card in enumerate(counts):
+            if not n_card:
+                continue
+            counts[card] -= 1
+            player, _ = total_of([6, 5, VALUES[card]])
+            dealer = dealer_outcomes([11, VALUES[hole]], counts)
+            win = sum(p for result, p in dealer.items() if result == 'BUST' or result < player)
+            lose = sum(p for result, p in dealer.items() if result != 'BUST' and result > player)
+            expected += n_hole / holes * n_card / deck * 2 * (win - lose)
+            counts[card] += 1
+        counts[hole] += 1
+
+    evs = EVEngine(1).evaluate(11, False, 11, True, True, counts)
+    assert abs(evs['DOUBLE'] - expected) < 1e-12
+    assert abs(expected - 0.2403) < 1e-4
+    assert evs['DOUBLE'] > evs['HIT']
+
+
+def test_two_deck_eleven_doubles_against_an_ace():
+    import strategy_gen
+
+    engine = EVEngine(2)
+    counts = full_shoe(2)
+    counts[ACE] -= 1
+    evs = strategy_gen._weighted_evs(engine, strategy_gen.hands_by_total(2)[11, 0], 11, counts, True)
+    assert max(evs, key=evs.get) == 'DOUBLE'
@@ -0,0 +1,50 @@
+import pytest
+
+import main_loop
+
+
+@pytest.fixture(autouse=True)
+def fresh_count():
+    main_loop.reset_state(1)
+    yield
+    main_loop.reset_state(1)
+
+
+def play(*frames):
+    """Feed (player, dealer) frames through process_frame; returns the last action."""
+    action = None
+    for player, dealer in frames:
+        _, _, action = main_loop.process_frame(player, dealer)
+    return action
+
+
+def test_new_round_sharing_ranks_counts_every_card():
+    play((['10', '7'], ['9', '8', 'K']), (['10', '3'], ['5']))
+    assert main_loop.agent.cards_seen == 8
+    assert main_loop.agent.running_count == -1
+
+
+def test_new_round_after_surrender_with_the_same_upcard_is_not_a_misread(capsys):
+    assert play((['10', '6'], ['K'])) == 'SURRENDER'
+    play((['9', '6'], ['K']))
+    assert main_loop.agent.cards_seen == 6
+    assert main_loop.agent.running_count == -1
+    assert "rolled back" not in capsys.readouterr().out
+
+
+def test_card_changed_back_on_the_next_frame_is_rolled_back():
+    play((['10', '6'], ['7']), (['10', '5'], ['7']), (['10', '6'], ['7']))
+    assert main_loop.agent.cards_seen == 3
+    assert main_loop.agent.running_count == 0
+
+
+def test_extra_card_that_disappears_is_rolled_back():
+    play((['10', '6'], ['7']), (['10', '6', '5'], ['7']), (['10', '6'], ['7']))
+    assert main_loop.agent.cards_seen == 3
+    assert main_loop.agent.running_count == 0
+
+
+def test_hands_growing_within_a_round_count_only_new_cards():
+    play((['10', '2'], ['7']), (['10', '2', '3'], ['7']), (['10', '2', '3'], ['7', '9']))
+    assert main_loop.agent.cards_seen == 5
+    assert main_loop.agent.running_count == 1
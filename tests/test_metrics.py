@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.enable(False)
+    metrics.reset()
+
+
+def test_disabled_records_nothing():
+    metrics.enable(False)
+    metrics.observe("stage", 0.01)
+    metrics.incr("frames")
+    with metrics.span("other"):
+        pass
+    snap = metrics.snapshot()
+    assert snap["stages"] == {}
+    assert snap["counters"] == {}
+
+
+def test_concurrent_increments_are_not_lost():
+    metrics.enable()
+    threads = [threading.Thread(target=lambda: [metrics.incr("frames") for _ in range(20000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.snapshot()["counters"]["frames"] == 8 * 20000
@@ -0,0 +1,16 @@
+import pytest
+
+import monte_carlo
+
+
+def test_same_seed_and_workers_reproduce_the_report():
+    first = monte_carlo.run_parallel(60, 50, workers=2, seed=7)
+    second = monte_carlo.run_parallel(60, 50, workers=2, seed=7)
+    assert first == second
+    assert first[0]['sessions'] == 60
+    assert monte_carlo.run_parallel(60, 50, workers=2, seed=8)[0] != first[0]
+
+
+def test_no_sessions_is_rejected():
+    with pytest.raises(ValueError):
+        monte_carlo.run_parallel(0, 50, workers=2)
@@ -0,0 +1,56 @@
+import asyncio
+
+import cards_viewing
+import main_loop
+import replay
+from frame_cache import FrameCache
+
+
+class _Reply:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedClient:
+    """Model client that answers each call with the next scripted reply."""
+    def __init__(self, replies):
+        self.models = self
+        self.replies = list(replies)
+
+    def generate_content(self, **kwargs):
+        return _Reply(self.replies.pop(0))
+
+
+def record_session(tmp_path, monkeypatch, frames, replies):
+    """Run `frames` through main_loop.analyze_stage with a recording client; return the session log."""
+    monkeypatch.setattr(cards_viewing, "client", replay.RecordingClient(ScriptedClient(replies)))
+    monkeypatch.setattr(main_loop, "frame_cache", FrameCache())
+    monkeypatch.setattr(main_loop, "session", replay.SessionRecorder(str(tmp_path)))
+    main_loop.reset_state()
+
+    async def run():
+        queue, actions = asyncio.Queue(), asyncio.Queue(maxsize=1)
+        for frame in frames:
+            queue.put_nowait((0.0, frame, "image/jpeg"))
+        stage = asyncio.ensure_future(main_loop.analyze_stage(queue, actions))
+        while not queue.empty() or not main_loop.analyze_worker._pending.done():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        stage.cancel()
+
+    asyncio.run(run())
+    main_loop.session.close()
+    return replay.load_session(str(tmp_path))
+
+
+def test_failed_frame_is_recorded_and_its_reply_does_not_leak(tmp_path, monkeypatch):
+    good = replay.synthetic_reply(["10", "6"], ["9"])
+    entries = record_session(tmp_path, monkeypatch, [b"a", b"b", b"a"], [good, "I can't see any cards"])
+
+    assert [entry["response"] for entry in entries] == [good, "I can't see any cards", None]
+    assert entries[1]["error"] is not None and entries[1]["player"] is None
+    assert entries[2]["error"] is None and entries[2]["player"] == ["10", "6"]
+
+    report = replay.replay(entries, cache=FrameCache())
+    assert report["parse_failures"] == 1
+    assert report["mismatches"] == []
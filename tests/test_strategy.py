@@ -0,0 +1,114 @@
+import itertools
+
+import strategy
+
+
+def legacy_move(player_val, is_soft, dealer_val, num_cards):
+    """The if/elif chart AI_Player.get_move used before the table, kept verbatim as the reference."""
+    # Surrender
+    if num_cards == 2:
+        if player_val == 16 and dealer_val in [9, 10, 11]: return 'SURRENDER'
+        if player_val == 15 and dealer_val == 10: return 'SURRENDER'
+
+    # Soft Totals
+    if is_soft:
+        if player_val >= 20: return 'STAND'
+        if player_val == 19: return 'DOUBLE' if dealer_val == 6 and num_cards == 2 else 'STAND'
+        if player_val == 18:
+            if dealer_val in [2,3,4,5,6]: return 'DOUBLE' if num_cards == 2 else 'STAND'
+            if dealer_val in [9,10,11]: return 'HIT'
+            return 'STAND'
+        if player_val == 17: return 'DOUBLE' if dealer_val in [3,4,5,6] and num_cards == 2 else 'HIT'
+        if player_val in [15,16]: return 'DOUBLE' if dealer_val in [4,5,6] and num_cards == 2 else 'HIT'
+        if player_val in [13,14]: return 'DOUBLE' if dealer_val in [5,6] and num_cards == 2 else 'HIT'
+        return 'HIT'
+
+    # Hard Totals
+    if player_val >= 17: return 'STAND'
+    if player_val == 16: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
+    if player_val == 15: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
+    if player_val in [13,14]: return 'STAND' if dealer_val in [2,3,4,5,6] else 'HIT'
+    if player_val == 12: return 'STAND' if dealer_val in [4,5,6] else 'HIT'
+    if player_val == 11: return 'DOUBLE' if num_cards == 2 else 'HIT'
+    if player_val == 10: return 'DOUBLE' if dealer_val < 10 and num_cards == 2 else 'HIT'
+    if player_val == 9: return 'DOUBLE' if dealer_val in [3,4,5,6] and num_cards == 2 else 'HIT'
+    return 'HIT'
+
+
+def reachable_hands(max_cards=5):
+    """(value, soft, num_cards) of every unbusted hand of 2..max_cards cards (Ace = 11)."""
+    states = set()
+    for n in range(2, max_cards + 1):
+        for cards in itertools.combinations_with_replacement(range(2, 12), n):
+            hard = sum(1 if c == 11 else c for c in cards)
+            soft = 11 in cards and hard + 10 <= 21
+            value = hard + 10 if soft else hard
+            if value <= 21:
+                states.add((value, soft, n))
+    return states
+
+
+def test_table_matches_legacy_chart():
+    checked = 0
+    for (value, soft, num_cards), dealer_val in itertools.product(reachable_hands(), range(2, 12)):
+        two_cards = num_cards == 2
+        assert strategy.lookup(value, soft, dealer_val, two_cards, two_cards) == \
+            legacy_move(value, soft, dealer_val, num_cards), (value, soft, dealer_val, num_cards)
+        checked += 1
+    assert checked > 0
+
+
+def test_as_array_matches_lookup():
+    table = strategy.as_array()
+    for soft, total, dealer_val, flag in itertools.product((0, 1), range(22), range(2, 12), (0, 1)):
+        assert strategy.MOVES[table[soft, total, dealer_val, flag, flag]] == \
+            strategy.lookup(total, soft, dealer_val, flag, flag)
+
+
+def test_rules_table_without_cache_is_the_builtin_chart(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    assert strategy.rules_table(1, cache_dir=cache_dir) is strategy.TABLE
+    assert not (tmp_path / "cache").exists()
+
+
+def test_rules_table_reads_a_saved_table(tmp_path):
+    table = bytes(len(strategy.TABLE))
+    strategy.save_table(table, 2, cache_dir=str(tmp_path))
+    assert strategy.rules_table(2, cache_dir=str(tmp_path)) == table
+
+
+def test_two_card_hands_cover_every_deal():
+    import strategy_gen
+    from ev_engine import full_shoe
+
+    counts = full_shoe(1)
+    hands = strategy_gen.hands_by_total(2).values()
+    assert abs(sum(strategy_gen.draw_probability(cards, counts) for group in hands for cards in group) - 1) < 1e-12
+
+
+def test_generated_hard_12_stands_against_4():
+    # 10-2 alone says hit with 1 or 2 decks; weighted over every 12 (and every multi-card 12) it is a stand
+    import strategy_gen
+
+    for num_decks in (1, 2):
+        _, _, cells = strategy_gen._decide_rows(num_decks, False, True, 4, 0)
+        assert cells[12, 1, 1] == strategy.STAND
+        assert cells[12, 0, 0] == strategy.STAND
+
+
+def test_no_surrender_agent_never_surrenders(monkeypatch):
+    from blackjack_agent import BlackjackAgent
+
+    # No generated tables, as in a fresh checkout
+    monkeypatch.setattr(strategy, "load_table", lambda *args: None)
+    agent = BlackjackAgent(num_decks=1, surrender=False)
+    assert agent.get_move(['10H', '6D'], ['KS']) == 'HIT'
+    assert 'SURRENDER' not in agent.moves
+    assert BlackjackAgent(num_decks=1).get_move(['10H', '6D'], ['KS']) == 'SURRENDER'
+
+
+def test_rules_table_does_not_memoize_the_chart(tmp_path):
+    assert strategy.rules_table(3, cache_dir=str(tmp_path)) is strategy.TABLE
+    table = bytes(len(strategy.TABLE))
+    strategy.save_table(table, 3, cache_dir=str(tmp_path))
+    assert strategy.rules_table(3, cache_dir=str(tmp_path)) == table